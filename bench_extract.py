@@ -0,0 +1,98 @@
+"""
+Extraction Benchmark
+Times image URL extraction per thread page: the old whole-document
+BeautifulSoup scan against every html_extract backend installed here.
+
+    python bench_extract.py [page.html ...] [--repeat N]
+
+Without pages a synthetic XenForo thread page is used. Save a real page
+from the browser for representative numbers.
+"""
+
+import argparse
+import sys
+import time
+
+from html_extract import BACKENDS, absolute_url, extract_image_urls
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+
+def synthetic_page(posts=20, images_per_post=10):
+    """A thread page with chrome around the posts, roughly XenForo's shape."""
+    chrome = "".join(
+        f'<li class="p-navEl"><a href="/forums/{n}/"><img src="/styles/icon{n}.png"></a></li>'
+        for n in range(60)
+    )
+    parts = [f'<html><head><title>Thread</title></head><body><nav><ul>{chrome}</ul></nav>']
+    for post in range(posts):
+        images = "".join(
+            f'<img src="https://jpg5.su/images/{post}_{n}.md.jpg" class="bbImage" alt="">'
+            f'<br>text between images<br>'
+            for n in range(images_per_post)
+        )
+        parts.append(
+            f'<article class="message" data-content="post-{post}">'
+            f'<div class="message-avatar"><img src="/data/avatars/m/{post}.jpg"></div>'
+            f'<div class="message-main"><div class="message-content">'
+            f'<div class="message-body"><div class="bbWrapper">{images}</div></div>'
+            f'<div class="message-signature"><div class="bbWrapper">'
+            f'<img src="/sig/{post}.gif"></div></div>'
+            f'</div><div class="reactionsBar"><img src="/styles/react.png"></div></div>'
+            f'</article>'
+        )
+    parts.append('<footer>' + chrome + '</footer></body></html>')
+    return "".join(parts)
+
+
+def bs4_extract(html):
+    """The extraction both engines used before html_extract."""
+    soup = BeautifulSoup(html, 'html.parser')
+    image_urls = []
+    for img in soup.find_all('img'):
+        img_url = img.get('src') or img.get('data-src')
+        if img_url:
+            image_urls.append(absolute_url(img_url))
+    return list(dict.fromkeys(image_urls))
+
+
+def time_per_page(fn, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            fn(html)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(pages))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark image URL extraction.")
+    parser.add_argument("pages", nargs="*", help="saved thread pages (default: synthetic page)")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the pages (default 20)")
+    args = parser.parse_args(argv)
+
+    if args.pages:
+        pages = []
+        for path in args.pages:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+    else:
+        pages = [synthetic_page()]
+
+    candidates = [("bs4 full scan", bs4_extract)] if BeautifulSoup else []
+    candidates += [(name, lambda html, name=name: extract_image_urls(html, name)) for name in BACKENDS]
+
+    print(f"{len(pages)} page(s), {sum(len(p) for p in pages) // 1024} KB, {args.repeat} passes")
+    print(f"{'Extractor':<15}{'ms/page':>10}{'URLs':>8}")
+    for name, fn in candidates:
+        found = sum(len(fn(html)) for html in pages)
+        print(f"{name:<15}{time_per_page(fn, pages, args.repeat):>10.2f}{found:>8}")
+    if BeautifulSoup is None:
+        print("(beautifulsoup4 not installed: baseline skipped)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
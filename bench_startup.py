@@ -0,0 +1,90 @@
+"""
+Startup Benchmark
+Times what the GUI imports before its window can appear, using Python's
+-X importtime, and checks it against a budget.
+
+    python bench_startup.py [--budget-ms 400] [--top 15] [--repeat 3]
+
+Exits 1 if importing main takes longer than the budget or loads a module
+that should wait until first use (DEFERRED_MODULES), so it can gate CI.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = 400
+# Only needed once a download starts. PIL is not listed: ttkbootstrap
+# imports it for its own images.
+DEFERRED_MODULES = ("playwright", "requests", "urllib3", "aiohttp", "lxml", "selectolax", "bs4")
+
+# import time: self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(module):
+    """[(name, self_us, cumulative_us, depth)] for one cold import of module."""
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=script_dir, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def own_import(rows, module):
+    """
+    The row for module itself and the rows for its direct imports, leaving
+    out what the interpreter loaded before it (site, encodings, ...).
+    Children are listed before their parent, so they are the depth-1 rows
+    since the previous top-level import.
+    """
+    end = max(i for i, row in enumerate(rows) if row[3] == 0 and row[0] == module)
+    start = max((i for i, row in enumerate(rows[:end]) if row[3] == 0), default=-1) + 1
+    return rows[end], [row for row in rows[start:end] if row[3] == 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check GUI import time against a budget.")
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"allowed total import time (default {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--top", type=int, default=15, help="slowest top-level imports to list")
+    parser.add_argument("--repeat", type=int, default=3, help="runs to take the fastest of (default 3)")
+    args = parser.parse_args(argv)
+
+    try:
+        runs = [measure(args.module) for _ in range(max(1, args.repeat))]
+    except RuntimeError as e:
+        print(f"import {args.module} failed: {e}")
+        return 1
+    # The fastest run is the least disturbed by the rest of the machine
+    rows = min(runs, key=lambda rows: own_import(rows, args.module)[0][2])
+    target, children = own_import(rows, args.module)
+    total_ms = target[2] / 1000
+
+    print(f"import {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"{'Imported by ' + args.module:<40}{'ms':>8}")
+    for name, _, cumulative_us, _ in sorted(children, key=lambda r: -r[2])[:args.top]:
+        print(f"{name:<40}{cumulative_us / 1000:>8.1f}")
+
+    loaded = sorted({r[0] for r in rows if r[0].split(".")[0] in DEFERRED_MODULES})
+    if loaded:
+        print(f"Loaded at startup but should wait for first use: {', '.join(loaded)}")
+    if loaded or total_ms > args.budget_ms:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
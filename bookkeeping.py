@@ -0,0 +1,225 @@
+"""
+Bookkeeping
+What both engines record for one forum thread as they download it: the
+folder's journal, retry list and filenames, the pager and incremental sync
+point, the page cache, and each page's state in the queue.
+
+The engines only fetch pages and images and report the outcome here, so
+they agree on when a page or image counts as done.
+"""
+
+import os
+
+from dedupe import dedupe_file
+from engine_config import dedupe_mode
+from file_utils import FilenameAllocator
+from html_extract import extract_image_urls, max_post_id
+from journal import DownloadJournal, SyncFrontier, FINISHED_STATES
+from pagination import ThreadPager, page_number
+from retry_utils import RetryLaterList, is_gone, http_status
+
+
+class ThreadBook:
+    """
+    One thread's records for a run, kept in folder. Safe to call from
+    several threads: the journal, retry list, queue store and caches each
+    do their own locking.
+
+    tag prefixes page lines when several threads log side by side.
+    """
+
+    def __init__(self, config, folder, urls, log, queue_store=None, hash_index=None,
+                 page_cache=None, tag=""):
+        self.log = log
+        self.tag = tag
+        self.queue_store = queue_store
+        self.hash_index = hash_index
+        self.page_cache = page_cache
+        self.dedupe_mode = dedupe_mode(config)
+        self.output_directory = config["output_directory"]
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+        self.urls = list(urls)
+        self.retry_later = RetryLaterList(folder)
+        self.allocator = FilenameAllocator(folder)
+        self.journal = DownloadJournal(folder)
+
+        # Grows the queue to the thread's real length once page one is read
+        self.pager = ThreadPager(self.urls)
+
+        # Incremental sync: restart at the page the last run reached and
+        # leave out posts it has already seen
+        self.sync_enabled = config.get("incremental_sync", True)
+        self.sync_post_id = None
+        sync = self.journal.thread_sync(self.pager.base_url) if self.sync_enabled else None
+        if sync:
+            self.pager.resume(sync[0])
+            self.sync_post_id = sync[1]
+        self.frontier = SyncFrontier(self.journal, self.pager)
+
+    def start(self):
+        if self.pager.resume_page:
+            self.log(f"Sync: {self.tag}resuming at page {self.pager.resume_page}, "
+                     f"skipping posts up to #{self.sync_post_id}")
+
+    def close(self):
+        """Close the journal and save the retry list."""
+        self.journal.close()
+        self.retry_later.save()
+        if len(self.retry_later):
+            self.log(f"⚠️ {len(self.retry_later)} pages need another pass: {self.retry_later.path}")
+
+    # -- Pages --------------------------------------------------------------
+
+    def set_state(self, url, state, post_id=None):
+        """
+        Record a page's progress in the persistent queue, if there is one. A
+        page done in full leaves the retry list, and every finished page is
+        settled for the sync point; post_id is the highest post of a page
+        whose images were all saved.
+        """
+        if self.queue_store:
+            self.queue_store.set_state(url, state)
+        if state == "done":
+            self.retry_later.discard(url)
+        if state in ("done", "failed") and self.sync_enabled:
+            self.frontier.settle(url, state == "done", post_id)
+
+    def already_done(self, url):
+        """
+        True if the journal has url in full and nothing can have been added
+        to it since: it is not the page sync resumes from, and it was not
+        the thread's last page when saved.
+        """
+        if not self.journal.page_done(url) or self.pager.is_resume_page(url):
+            return False
+        return not self.journal.page_open(url)
+
+    def is_last_page(self, url):
+        """True if no later page of the thread is known to exist."""
+        last_page = self.pager.last_page
+        if last_page is None:
+            last_page = max((page_number(u) for u in self.urls if self.pager.owns(u)), default=0)
+        return page_number(url) >= last_page
+
+    def page_failed(self, url):
+        self.retry_later.add(url)
+        self.set_state(url, "failed")
+
+    def cached_page(self, url):
+        """The cached copy of url to revalidate, or None."""
+        return self.page_cache.lookup(url) if self.page_cache else None
+
+    def not_modified(self, url):
+        """The server answered 304 for the cached copy of url."""
+        self.page_cache.refresh(url)
+
+    def remember_page(self, url, html, headers=None):
+        """Cache a fetched page. Returns True if it matches the cached copy."""
+        if not self.page_cache or not html:
+            return False
+        headers = headers or {}
+        return self.page_cache.store(url, html, headers.get("ETag"), headers.get("Last-Modified"))
+
+    def learn(self, html):
+        """
+        Queue the rest of the thread from a fetched page's pageNav. The new
+        pages are saved to the persistent queue too, so a rerun still has
+        them when it skips the page they were learned from. Returns how many.
+        """
+        added = self.pager.learn(html)
+        if added:
+            if self.queue_store:
+                self.queue_store.append(self.urls[-added:])
+            self.log(f"Thread has {self.pager.last_page} pages: queued {added} more")
+        return added
+
+    def skip_unchanged(self, url, unchanged):
+        """
+        True (and the page is done) if it is unchanged since the cached copy
+        and was saved in full last time, so there is nothing new on it.
+        """
+        if not unchanged or not self.journal.page_done(url):
+            return False
+        self.log("Unchanged since last run, skipping")
+        self.set_state(url, "done")
+        return True
+
+    def plan_page(self, url, html):
+        """
+        (image_urls, pending, post_id) for a fetched page: its images, those
+        an earlier run has not already saved or rejected, and its highest
+        post ID. Names for pending are reserved by the caller.
+        """
+        after_post = self.sync_post_id if self.pager.is_resume_page(url) else None
+        image_urls = extract_image_urls(html, after_post=after_post)
+        statuses = self.journal.image_statuses(image_urls)
+        pending = [u for u in image_urls if statuses.get(u) not in FINISHED_STATES]
+        return image_urls, pending, max_post_id(html)
+
+    def finish_page(self, index, url, image_count, post_id, failed, downloaded):
+        """Record a page once all its images are settled."""
+        if post_id is None:
+            # A login or challenge page instead of the thread: try it again
+            self.log(f"⚠️ {self.tag}Page {index} has no posts, added to retry list")
+            self.journal.mark_page(url, "failed", 0)
+            self.page_failed(url)
+            return
+        self.journal.mark_page(url, "partial" if failed else "done", image_count,
+                               last=self.is_last_page(url))
+        if failed:
+            self.set_state(url, "failed")
+        else:
+            self.set_state(url, "done", post_id)
+        self.log(f"{self.tag}Page {index} complete: {downloaded} images downloaded")
+
+    # -- Images -------------------------------------------------------------
+
+    def image_failed(self, img_url, page_url, error):
+        """
+        Record an image that could not be fetched. Returns True if the host
+        says it is gone for good (HTTP 404 or 410): it is journalled as
+        missing and does not hold its page back. Any other error, retries
+        spent, leaves the image failed and its page on the retry list.
+        """
+        if is_gone(error):
+            self.journal.record_image(img_url, page_url, "missing")
+            self.log(f"  ⚠️ Missing (HTTP {http_status(error)}), skipped: {img_url[:60]}")
+            return True
+        self.journal.record_image(img_url, page_url, "failed")
+        self.retry_later.add(page_url)
+        return False
+
+    def image_saved(self, img_url, page_url, filename, written, digest=None):
+        """
+        Record a finished image download; written is None if the image was
+        rejected. Deduplicates the new file by digest. Returns
+        (filename, duplicate_of), or None for a rejected image.
+        """
+        if written is None:
+            self.journal.record_image(img_url, page_url, "rejected")
+            return None
+
+        duplicate_of = None
+        if self.hash_index:
+            filepath = os.path.join(self.folder, filename)
+            duplicate_of = dedupe_file(self.hash_index, filepath, digest, self.dedupe_mode, written)
+        if duplicate_of and self.dedupe_mode == "skip":
+            self.journal.record_image(img_url, page_url, "duplicate", written)
+        else:
+            self.journal.record_image(img_url, page_url, "done", written, filename)
+        return filename, duplicate_of
+
+    def report_image(self, result):
+        """Log what image_saved returned. True if it is a new download."""
+        if not result:
+            return False
+        filename, duplicate_of = result
+        if duplicate_of:
+            original = os.path.relpath(duplicate_of, self.output_directory)
+            action = "skipped" if self.dedupe_mode == "skip" else f"linked as {filename}"
+            self.log(f"  ↺ Duplicate of {original}, {action}")
+            return False
+        self.log(f"  ✓ Downloaded: {filename}")
+        return True
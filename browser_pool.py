@@ -0,0 +1,75 @@
+"""
+Browser Pool
+A single long-lived Chromium instance for pages that need a real browser.
+"""
+
+import time
+
+from http_client import browser_cookies
+
+
+class BrowserPool:
+    """
+    Launches Chromium on first use, loads cookies ({name: value}, as
+    http_client.load_cookies returns them) into one browser context, and
+    reuses it for every page until close() is called.
+
+    Playwright's sync API is bound to the thread that started it, so a pool
+    must only be used from the thread that first calls fetch().
+    """
+
+    def __init__(self, cookies, headless=True):
+        self.cookies = cookies
+        self.headless = headless
+        self._playwright = None
+        self._browser = None
+        self._context = None
+
+    def _start(self):
+        # Imported on first fetch: Playwright is slow to load and most runs
+        # never need a browser past startup, or at all
+        from playwright.sync_api import sync_playwright
+        self._playwright = sync_playwright().start()
+        self._browser = self._playwright.chromium.launch(headless=self.headless)
+        self._context = self._browser.new_context()
+
+        if self.cookies:
+            self._context.add_cookies(browser_cookies(self.cookies))
+
+    @property
+    def started(self):
+        return self._context is not None
+
+    def fetch(self, url):
+        """Load url in a fresh tab and return the rendered HTML."""
+        if not self.started:
+            self._start()
+
+        page = self._context.new_page()
+        try:
+            page.goto(url, wait_until='networkidle', timeout=60000)
+            time.sleep(3)
+
+            # Scroll to load images
+            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            time.sleep(2)
+
+            return page.content()
+        finally:
+            page.close()
+
+    def close(self):
+        """Shut down the browser. Safe to call more than once."""
+        if self._context is not None:
+            self._context.close()
+        if self._browser is not None:
+            self._browser.close()
+        if self._playwright is not None:
+            self._playwright.stop()
+        self._playwright = self._browser = self._context = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,11 +1,16 @@
 import json
 import os
+import threading
 import tkinter as tk
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-from ttkbootstrap.scrolled import ScrolledFrame
 from tkinter import filedialog
 
+from queue_store import QueueStore, queue_path
+
+# Queue rows inserted per event-loop turn
+ROW_CHUNK = 500
+
 def build_config_frame(parent, config_path):
     """Ultra-sleek settings interface."""
     frame = tk.Frame(parent, bg='#0a0e27', relief='flat', bd=0)
@@ -215,17 +220,23 @@ def build_urls_frame(parent, urls_file):
     url_entry.pack(side="left", fill="x", expand=True, padx=18, ipady=12)
 
     def add_url():
-        new_url = url_entry.get().strip()
-        if new_url:
-            loaded_urls = get_urls_from_file()
-            loaded_urls.append(new_url)
-            with open(urls_file, "w") as f:
-                for u in loaded_urls:
-                    f.write(u + "\n")
-            url_entry.delete(0, "end")
-            refresh_list()
+        # Several URLs may be typed or pasted at once, separated by spaces
+        add_urls(url_entry.get().split())
+        url_entry.delete(0, "end")
+
+    def paste_urls(event):
+        """Paste a multi-line clipboard straight into the queue."""
+        try:
+            pasted = url_entry.clipboard_get().split()
+        except tk.TclError:
+            return None
+        if len(pasted) < 2:
+            return None  # a single URL pastes into the entry as usual
+        add_urls(pasted)
+        return "break"
 
     url_entry.bind("<Return>", lambda e: add_url())
+    url_entry.bind("<<Paste>>", paste_urls)
 
     add_frame = tk.Frame(add_container, bg='#6366f1', relief='flat', bd=0, cursor='hand2')
     add_frame.pack(side="right")
@@ -264,107 +275,195 @@ def build_urls_frame(parent, urls_file):
     )
     queue_count.pack(side="right")
 
-    # List
+    delete_frame = tk.Frame(queue_header, bg='#7f1d1d', relief='flat', bd=0, cursor='hand2')
+    delete_frame.pack(side="right", padx=(0, 18))
+    delete_frame.bind("<Button-1>", lambda e: remove_selected())
+
+    delete_label = tk.Label(
+        delete_frame,
+        text="Remove selected",
+        font=("SF Pro Display", 9, "bold"),
+        foreground="#ef4444",
+        bg='#7f1d1d',
+        cursor='hand2'
+    )
+    delete_label.pack(padx=14, pady=6)
+    delete_label.bind("<Button-1>", lambda e: remove_selected())
+
+    search_var = tk.StringVar()
+    search_entry = tk.Entry(
+        queue_header,
+        textvariable=search_var,
+        font=("SF Pro Display", 10),
+        bg='#0f172a',
+        fg='#cbd5e1',
+        relief='flat',
+        bd=0,
+        insertbackground='#6366f1',
+        width=30
+    )
+    search_entry.pack(side="right", padx=(0, 18), ipady=6)
+    search_var.trace_add("write", lambda *args: show_entries())
+
+    search_hint = tk.Label(
+        queue_header,
+        text="Search",
+        font=("SF Pro Display", 10),
+        foreground="#64748b",
+        bg='#1e293b'
+    )
+    search_hint.pack(side="right", padx=(0, 8))
+
+    # List: a Treeview only draws the rows in view, so thousands of URLs
+    # cost no more than a screenful
     list_container = tk.Frame(content, bg='#334155', relief='flat', bd=0)
     list_container.pack(fill="both", expand=True)
 
-    container = ScrolledFrame(list_container, autohide=True, bootstyle="rounded")
-    container.pack(fill="both", expand=True, padx=2, pady=2)
-    content_area = container
+    tree = tb.Treeview(
+        list_container,
+        columns=("num", "url", "state"),
+        show="headings",
+        selectmode="extended",
+        bootstyle="dark"
+    )
+    tree.heading("num", text="#")
+    tree.heading("url", text="URL", anchor="w")
+    tree.column("num", width=70, stretch=False, anchor="center")
+    tree.heading("state", text="State")
+    tree.column("url", anchor="w")
+    tree.column("state", width=100, stretch=False, anchor="center")
+    tree_scroll = tb.Scrollbar(list_container, orient="vertical", command=tree.yview, bootstyle="round")
+    tree.configure(yscrollcommand=tree_scroll.set)
+    tree_scroll.pack(side="right", fill="y", pady=2)
+    tree.pack(fill="both", expand=True, padx=2, pady=2)
+    tree.bind("<Delete>", lambda e: remove_selected())
+    tree.bind("<BackSpace>", lambda e: remove_selected())
+
+    empty_frame = tk.Frame(list_container, bg='#334155', relief='flat', bd=0)
+
+    empty_label = tk.Label(
+        empty_frame,
+        text="Queue is empty",
+        font=("SF Pro Display", 16, "bold"),
+        foreground="#475569",
+        bg='#334155'
+    )
+    empty_label.pack()
+
+    empty_hint = tk.Label(
+        empty_frame,
+        text="Add URLs above to build your queue",
+        font=("SF Pro Display", 11),
+        foreground="#64748b",
+        bg='#334155'
+    )
+    empty_hint.pack(pady=(6, 0))
+
+    # urls.txt is imported by refresh_list, off the Tk thread
+    queue_store = QueueStore(queue_path(urls_file))
 
-    row_frames = []
+    # [iid, url, state] in queue order, iid being the store's row id; the
+    # tree shows the ones matching the search
+    entries = []
 
-    def get_urls_from_file():
-        try:
-            with open(urls_file, "r") as f:
-                return [line.strip() for line in f if line.strip()]
-        except FileNotFoundError:
-            return []
+    def matches(url):
+        query = search_var.get().strip().lower()
+        return not query or query in url.lower()
 
-    def refresh_list():
-        for rf in row_frames:
-            rf.destroy()
-        row_frames.clear()
-
-        loaded_urls = get_urls_from_file()
-        queue_count.config(text=f"{len(loaded_urls)} URLs")
-
-        if not loaded_urls:
-            empty_frame = tk.Frame(content_area, bg='#334155', relief='flat', bd=0)
-            empty_frame.pack(pady=100)
-            
-            empty_label = tk.Label(
-                empty_frame,
-                text="Queue is empty",
-                font=("SF Pro Display", 16, "bold"),
-                foreground="#475569",
-                bg='#334155'
-            )
-            empty_label.pack()
-            
-            empty_hint = tk.Label(
-                empty_frame,
-                text="Add URLs above to build your queue",
-                font=("SF Pro Display", 11),
-                foreground="#334155",
-                bg='#334155'
-            )
-            empty_hint.pack(pady=(6, 0))
-            
-            row_frames.append(empty_frame)
+    def update_count():
+        queue_count.config(text=f"{len(entries)} URLs")
+        if entries:
+            empty_frame.place_forget()
         else:
-            for i, url in enumerate(loaded_urls):
-                row = tk.Frame(content_area, bg='#0f172a', relief='flat', bd=0)
-                row.pack(fill="x", pady=1, padx=1)
-                row_frames.append(row)
-
-                row_content = tk.Frame(row, bg='#0f172a', relief='flat', bd=0)
-                row_content.pack(fill="x", padx=22, pady=16)
-
-                num_badge = tk.Label(
-                    row_content,
-                    text=f"{i+1:02d}",
-                    font=("SF Pro Display", 10, "bold"),
-                    foreground="#6366f1",
-                    bg='#0f172a'
-                )
-                num_badge.pack(side="left", padx=(0, 18))
-
-                url_label = tk.Label(
-                    row_content,
-                    text=url,
-                    font=("SF Pro Display", 10),
-                    foreground="#cbd5e1",
-                    bg='#0f172a',
-                    anchor="w"
-                )
-                url_label.pack(side="left", fill="x", expand=True)
-
-                delete_frame = tk.Frame(row_content, bg='#7f1d1d', relief='flat', bd=0, cursor='hand2')
-                delete_frame.pack(side="right")
-                delete_frame.bind("<Button-1>", lambda e, idx=i: remove_url(idx))
-
-                delete_label = tk.Label(
-                    delete_frame,
-                    text="Remove",
-                    font=("SF Pro Display", 9, "bold"),
-                    foreground="#ef4444",
-                    bg='#7f1d1d',
-                    cursor='hand2'
-                )
-                delete_label.pack(padx=14, pady=6)
-                delete_label.bind("<Button-1>", lambda e, idx=i: remove_url(idx))
-
-    def remove_url(index):
-        loaded_urls = get_urls_from_file()
-        if 0 <= index < len(loaded_urls):
-            loaded_urls.pop(index)
-            with open(urls_file, "w") as f:
-                for u in loaded_urls:
-                    f.write(u + "\n")
-        refresh_list()
-
-    refresh_list()
+            empty_frame.place(relx=0.5, rely=0.5, anchor="center")
+
+    # Set while show_entries is still inserting rows; a newer redraw
+    # replaces the token so the older one stops
+    render_token = [None]
+
+    def show_entries():
+        """
+        Redraw the tree from entries under the current search. Rows go in
+        ROW_CHUNK at a time, one chunk per event-loop turn, so a big queue
+        never freezes the window.
+        """
+        token = render_token[0] = object()
+        tree.delete(*tree.get_children())
+        update_count()
+        rows = [(number, entry) for number, entry in enumerate(entries, 1) if matches(entry[1])]
+
+        def insert_chunk(start):
+            if render_token[0] is not token:
+                return
+            for number, (iid, url, state) in rows[start:start + ROW_CHUNK]:
+                tree.insert("", "end", iid=iid, values=(f"{number:02d}", url, state))
+            if start + ROW_CHUNK < len(rows):
+                tree.after(1, insert_chunk, start + ROW_CHUNK)
+            else:
+                render_token[0] = None
+
+        insert_chunk(0)
+
+    def refresh_list():
+        """Reload the queue, e.g. after the link generator replaced it."""
+        # Read on a worker thread; only the Tk thread may touch the tree
+        loaded = []
+
+        def load():
+            queue_store.sync_text(urls_file)
+            loaded.append(queue_store.entries())
+
+        worker = threading.Thread(target=load, daemon=True)
+        worker.start()
+
+        def apply_loaded():
+            if worker.is_alive():
+                frame.after(20, apply_loaded)
+            elif loaded:
+                entries[:] = [[str(row_id), url, state] for row_id, url, state in loaded[0]]
+                show_entries()
+
+        apply_loaded()
+
+    def add_urls(new_urls):
+        if not new_urls:
+            return
+        # URLs already in the queue are left out by the store
+        added = queue_store.append(new_urls)
+        if render_token[0] is not None:
+            # Still drawing: start over so the new rows land in order
+            entries.extend([str(row_id), url, "pending"] for row_id, url in added)
+            show_entries()
+            return
+        last = None
+        for row_id, url in added:
+            iid = str(row_id)
+            entries.append([iid, url, "pending"])
+            if matches(url):
+                tree.insert("", "end", iid=iid, values=(f"{len(entries):02d}", url, "pending"))
+                last = iid
+        if last:
+            tree.see(last)
+        update_count()
+
+    def remove_selected():
+        selected = set(tree.selection())
+        if not selected:
+            return
+        queue_store.remove(int(iid) for iid in selected)
+        first = next(i for i, entry in enumerate(entries) if entry[0] in selected)
+        entries[:] = [entry for entry in entries if entry[0] not in selected]
+        if render_token[0] is not None:
+            show_entries()
+            return
+        tree.delete(*selected)
+        # Only rows after the first removed one change number
+        for number, (iid, _, _) in enumerate(entries[first:], first + 1):
+            if tree.exists(iid):
+                tree.set(iid, "num", f"{number:02d}")
+        update_count()
+
+    frame.after_idle(refresh_list)
     frame.refresh_list = refresh_list
 
     return frame
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Content Deduplication
+Hash index of every file under the output directory, used to replace
+reposted images with hardlinks to the copy already on disk.
+
+Run this script to backfill the index over folders downloaded before
+deduplication existed:
+
+    python dedupe.py [--dry-run] [output_directory]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+INDEX_FILENAME = ".simpdl_hashes.db"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+DEDUPE_MODES = ("hardlink", "skip", "off")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    digest TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    bytes INTEGER,
+    added_at REAL NOT NULL
+);
+"""
+
+
+def new_hasher():
+    """Hash object used for all content digests."""
+    return hashlib.blake2b(digest_size=32)
+
+
+def hash_file(path):
+    hasher = new_hasher()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class HashIndex:
+    """
+    digest -> first stored copy, kept in output_directory/.simpdl_hashes.db.
+
+    Paths are stored relative to the output directory so the library can be
+    moved. Safe to share between download workers. With in_memory the index
+    lives only as long as the object and nothing is written to disk.
+    """
+
+    def __init__(self, output_directory, in_memory=False):
+        self.root = output_directory
+        self.path = ":memory:" if in_memory else os.path.join(output_directory, INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        if not in_memory:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def claim(self, digest, path, size=None):
+        """
+        Register path as the copy of digest, unless another file already holds
+        that content. Returns the absolute path of the existing copy, or None
+        if path is now the registered one.
+        """
+        rel_path = os.path.relpath(path, self.root)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path FROM files WHERE digest = ?", (digest,)
+            ).fetchone()
+            if row is not None:
+                existing = os.path.join(self.root, row[0])
+                if os.path.exists(existing) and row[0] != rel_path:
+                    return existing
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (digest, path, bytes, added_at) VALUES (?, ?, ?, ?)",
+                (digest, rel_path, size, time.time())
+            )
+        return None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def link_duplicate(existing, path):
+    """Replace path with a hardlink to existing. Returns False if unsupported."""
+    if os.path.samefile(existing, path):
+        return True
+    tmp_path = path + ".link"
+    try:
+        os.link(existing, tmp_path)
+    except OSError:
+        # Different filesystem, or one without hardlinks
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def dedupe_file(index, path, digest, mode="hardlink", size=None):
+    """
+    Apply the dedupe mode to a freshly written file.
+
+    Returns the path of the earlier copy if path duplicated one and was
+    linked to it ("hardlink" mode) or deleted ("skip" mode), else None.
+    Where hardlinks are unsupported path is kept as a copy of its own.
+    """
+    existing = index.claim(digest, path, size)
+    if existing is None:
+        return None
+    if mode == "skip":
+        os.remove(path)
+    elif not link_duplicate(existing, path):
+        return None
+    return existing
+
+
+def backfill(output_directory, dry_run=False, log=print):
+    """
+    Hash every file under output_directory, record it in the index, and turn
+    repeats into hardlinks. Returns (files_scanned, duplicates, bytes_saved).
+    A dry run only reports: it links nothing and leaves the index untouched.
+    """
+    index = HashIndex(output_directory, in_memory=dry_run)
+    scanned = duplicates = saved = 0
+    try:
+        for dirpath, dirnames, filenames in os.walk(output_directory):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for name in sorted(filenames):
+                if name.startswith(".") or name.endswith((".part", ".link")):
+                    continue
+                path = os.path.join(dirpath, name)
+                size = os.path.getsize(path)
+                digest = hash_file(path)
+                scanned += 1
+
+                existing = index.claim(digest, path, size)
+                if existing is None or os.path.samefile(existing, path):
+                    continue
+
+                duplicates += 1
+                rel_path = os.path.relpath(path, output_directory)
+                rel_existing = os.path.relpath(existing, output_directory)
+                if dry_run:
+                    log(f"  duplicate: {rel_path} == {rel_existing}")
+                    saved += size
+                elif link_duplicate(existing, path):
+                    log(f"  linked: {rel_path} -> {rel_existing}")
+                    saved += size
+                else:
+                    log(f"  kept (hardlinks unsupported): {rel_path}")
+    finally:
+        index.close()
+    return scanned, duplicates, saved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deduplicate an existing download library.")
+    parser.add_argument("directory", nargs="?", help="library root (default: output_directory from config)")
+    parser.add_argument("--dry-run", action="store_true", help="report duplicates without linking them")
+    args = parser.parse_args(argv)
+
+    directory = args.directory
+    if not directory:
+        script_dir = os.path.dirname(os.path.realpath(__file__))
+        with open(os.path.join(script_dir, "config", "config.json"), "r") as f:
+            directory = json.load(f).get("output_directory", "")
+    if not directory or not os.path.isdir(directory):
+        print(f"❌ Not a directory: {directory!r}")
+        return 1
+
+    print(f"Scanning {directory} ...")
+    scanned, duplicates, saved = backfill(directory, dry_run=args.dry_run)
+    print("=" * 70)
+    print(f"{'Files scanned:':<15}{scanned}")
+    print(f"{'Duplicates:':<15}{duplicates}")
+    label = "Reclaimable:" if args.dry_run else "Reclaimed:"
+    print(f"{label:<15}{saved / (1024 * 1024):.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except KeyboardInterrupt:
+        print("\n\nCancelled.")
@@ -0,0 +1,127 @@
+"""
+Download Pool
+Bounded worker pool for fetching images concurrently.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+
+class DownloadPool:
+    """
+    Runs download jobs on a fixed number of worker threads while capping
+    how many of them may talk to the same host at once.
+
+    Jobs are submitted under a group (the hybrid engine uses one per forum
+    thread) and workers take from the groups in turn, round-robin, so a
+    group with a deep backlog cannot hold up one with only a few images.
+    """
+
+    def __init__(self, workers=8, per_host=4):
+        self.workers = max(1, int(workers))
+        self.per_host = max(1, min(int(per_host), self.workers))
+        self._host_slots = {}
+        self._lock = threading.Lock()
+        # group -> deque of (future, task); the next group to serve is first
+        self._groups = OrderedDict()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"simpdl-download-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _host_slot(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host)
+                self._host_slots[host] = slot
+        return slot
+
+    def submit(self, url, fn, *args, group=None, **kwargs):
+        """Schedule fn(*args, **kwargs) as a download of url. Returns a Future."""
+        slot = self._host_slot(url)
+
+        def task():
+            with slot:
+                return fn(*args, **kwargs)
+
+        future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new downloads after shutdown")
+            self._groups.setdefault(group, deque()).append((future, task))
+            self._cond.notify()
+        return future
+
+    def _next_task(self):
+        """Take one task from the group whose turn it is, or None once shut down and drained."""
+        with self._cond:
+            while not self._groups and not self._shutdown:
+                self._cond.wait()
+            if not self._groups:
+                return None
+            group, tasks = self._groups.popitem(last=False)
+            item = tasks.popleft()
+            if tasks:
+                # Back of the line until every other group has had a turn
+                self._groups[group] = tasks
+            return item
+
+    def _worker(self):
+        while True:
+            item = self._next_task()
+            if item is None:
+                return
+            future, task = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = task()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def shutdown(self, wait=True):
+        """Stop once queued jobs are done; with wait, block until they are."""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+class MemoryBudget:
+    """
+    Caps how many bytes of response data all workers may hold in memory at
+    once. Each download reserves its buffer before it starts and waits while
+    the budget is exhausted.
+    """
+
+    def __init__(self, limit_bytes):
+        self.limit = max(1, int(limit_bytes))
+        self._used = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes):
+        nbytes = min(int(nbytes), self.limit)
+        with self._cond:
+            while self._used + nbytes > self.limit:
+                self._cond.wait()
+            self._used += nbytes
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._used -= nbytes
+                self._cond.notify_all()
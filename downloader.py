@@ -1,14 +1,19 @@
 import os
-import time
 import json
 import requests
 import tkinter as tk
 import threading
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-from bs4 import BeautifulSoup
 
-from image_utils import is_valid_image
+from event_bus import EventBus, coalesce
+from html_extract import extract_image_urls
+from image_utils import save_valid_image
+from file_utils import FilenameAllocator
+from rate_limit import AdaptiveRateLimiter
+from retry_utils import RetryPolicy, RetryLaterList
+from queue_store import open_queue
+from http_client import create_session, load_cookies
 
 def build_download_frame(parent, config_path, urls_file):
     """
@@ -40,9 +45,27 @@ def build_download_frame(parent, config_path, urls_file):
 
     download_in_progress = [False]
 
+    # Every update goes through the bus, whichever thread it comes from;
+    # only apply_events, on the Tk thread, touches the widgets.
+    events = EventBus()
+
     def log_message(msg):
-        log_text.insert(tk.END, msg + "\n")
-        log_text.see(tk.END)
+        events.log(msg)
+
+    def apply_events(batch):
+        lines, latest = coalesce(batch)
+        if lines:
+            log_text.insert(tk.END, "\n".join(lines) + "\n")
+            log_text.see(tk.END)
+        if "progress" in latest:
+            percent, status_text = latest["progress"]
+            progress_bar.configure(value=percent)
+            progress_label.config(text=status_text)
+        if "finished" in latest:
+            download_in_progress[0] = False
+            start_button.config(state="normal")
+
+    events.pump(frame, apply_events)
 
     def show_cookie_instructions():
         """Show instructions for extracting cookies"""
@@ -96,8 +119,9 @@ NOTE: Cookies expire! If download fails, extract fresh cookies.
                 config = json.load(f)
             output_directory = config.get("output_directory", "")
 
-            with open(urls_file, "r") as file:
-                urls = [line.strip() for line in file if line.strip()]
+            queue_store = open_queue(urls_file)
+            urls = queue_store.urls()
+            queue_store.close()
 
             if not urls:
                 log_message("No URLs found. Please add URLs first.")
@@ -115,90 +139,48 @@ NOTE: Cookies expire! If download fails, extract fresh cookies.
             with open(cookie_file, "r") as f:
                 cookie_data = json.load(f)
             
-            # Check if using new cookie_header format or old individual cookies
-            if "cookie_header" in cookie_data:
-                log_message("Using cookie header format (more reliable)")
-                cookies = cookie_data.get("parsed_cookies", {})
-                cookie_header = cookie_data.get("cookie_header", "")
-            else:
-                log_message("Using individual cookies format")
-                cookies = cookie_data
-                cookie_header = None
-            
+            cookies = load_cookies(cookie_data)
             log_message(f"Loaded cookies: {', '.join(cookies.keys())}")
 
             folder_name = get_folder_name(urls[0])
             combined_output_dir = os.path.join(output_directory, folder_name)
             if not os.path.exists(combined_output_dir):
                 os.makedirs(combined_output_dir)
+            allocator = FilenameAllocator(combined_output_dir)
 
-            # Setup requests session with cookies and headers
-            session = requests.Session()
-            
-            # Comprehensive headers to mimic real browser
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none',
-                'Sec-Fetch-User': '?1',
-                'Cache-Control': 'max-age=0',
-                'sec-ch-ua': '"Google Chrome";v="131", "Chromium";v="131", "Not_A Brand";v="24"',
-                'sec-ch-ua-mobile': '?0',
-                'sec-ch-ua-platform': '"Windows"',
-                'Referer': 'https://simpcity.cr/'
-            }
-            
-            # If we have a cookie header, use ONLY that (most reliable)
-            if cookie_header:
-                log_message("Using raw cookie header method (most reliable)...")
-                headers['Cookie'] = cookie_header
-                log_message(f"  ✓ Cookie header set ({len(cookie_header)} chars)")
-            else:
-                # Only set individual cookies if no header exists
-                log_message("Using individual cookie method...")
-                from http.cookiejar import Cookie
-                
-                for cookie_name, cookie_value in cookies.items():
-                    cookie_obj = Cookie(
-                        version=0,
-                        name=cookie_name,
-                        value=cookie_value,
-                        port=None,
-                        port_specified=False,
-                        domain='simpcity.cr',
-                        domain_specified=True,
-                        domain_initial_dot=False,
-                        path='/',
-                        path_specified=True,
-                        secure=True,
-                        expires=None,
-                        discard=True,
-                        comment=None,
-                        comment_url=None,
-                        rest={'HttpOnly': None},
-                        rfc2109=False
-                    )
-                    session.cookies.set_cookie(cookie_obj)
-                    log_message(f"  ✓ {cookie_name}")
-            
-            session.headers.update(headers)
+            # Shared client settings: pooled connections, default headers,
+            # cookies for the forum only, and timeouts
+            session = create_session(cookies)
+
+            # Pacing adapts per host instead of fixed sleeps
+            limiter = AdaptiveRateLimiter(
+                page_rate=config.get("page_rate", 1.0),
+                image_rate=config.get("image_rate", 8.0)
+            )
 
             # Warm-up: Visit homepage first to establish session properly
             log_message("Warming up session by visiting homepage...")
             try:
+                limiter.wait('https://simpcity.cr/')
                 warmup = session.get('https://simpcity.cr/', timeout=15)
+                limiter.feedback('https://simpcity.cr/', warmup.status_code,
+                                 retry_after=warmup.headers.get('Retry-After'))
                 log_message(f"Homepage status: {warmup.status_code}")
-                time.sleep(2)
             except Exception as e:
                 log_message(f"Warmup failed (continuing anyway): {e}")
 
+            # One retry policy for pages and images, with a budget for the whole job
+            retry = RetryPolicy(
+                max_attempts=config.get("retry_attempts", 4),
+                base_delay=config.get("retry_base_delay", 1.0),
+                max_delay=config.get("retry_max_delay", 30.0),
+                budget=config.get("retry_budget", 200)
+            )
+            retry_later = RetryLaterList(combined_output_dir)
+
+            def log_retry(attempt, delay, reason):
+                log_message(f"  ↻ {reason}, retry {attempt} in {delay:.1f}s")
+
             total_pages = len(urls)
             total_downloaded = 0
 
@@ -210,13 +192,6 @@ NOTE: Cookies expire! If download fails, extract fresh cookies.
                 else:
                     log_message(f"\n[Page {current_page}/{total_pages}] Fetching: {url}")
                 
-                # Add small delay before first request and between pages
-                if current_page == 1:
-                    log_message("Adding initial delay to avoid rate limiting...")
-                    time.sleep(3)
-                elif current_page > 1:
-                    time.sleep(2)
-                
                 try:
                     # Add referer header for this specific request
                     request_headers = session.headers.copy()
@@ -225,27 +200,26 @@ NOTE: Cookies expire! If download fails, extract fresh cookies.
                     else:
                         request_headers['Referer'] = 'https://simpcity.cr/'
                     
-                    response = session.get(url, timeout=30, headers=request_headers, allow_redirects=True)
+                    def fetch_page():
+                        limiter.wait(url)
+                        response = session.get(url, timeout=30, headers=request_headers, allow_redirects=True)
+                        limiter.feedback(url, response.status_code, retry_after=response.headers.get('Retry-After'))
+                        return response
+                    
+                    response = retry.call(fetch_page, on_retry=log_retry)
                     
                     log_message(f"Response status: {response.status_code}")
                     
                     if response.status_code == 403:
-                        log_message("⚠️ ERROR 403: Access Forbidden")
-                        log_message("Waiting 5 seconds and retrying...")
-                        time.sleep(5)
-                        
-                        # Retry once
-                        response = session.get(url, timeout=30, headers=request_headers, allow_redirects=True)
-                        log_message(f"Retry status: {response.status_code}")
-                        
-                        if response.status_code == 403:
-                            log_message("Still blocked. Skipping this page.")
-                            log_message("Tip: If this persists, extract fresh cookies")
-                            continue
+                        log_message("⚠️ ERROR 403: Access Forbidden. Skipping this page.")
+                        log_message("Tip: If this persists, extract fresh cookies")
+                        retry_later.add(url)
+                        continue
                     
                     if response.status_code != 200:
                         log_message(f"ERROR: HTTP {response.status_code}")
                         log_message("Skipping this page...")
+                        retry_later.add(url)
                         continue
                     
                     # Check for Cloudflare challenge
@@ -260,75 +234,66 @@ NOTE: Cookies expire! If download fails, extract fresh cookies.
                         log_message("Please extract fresh cookies from your browser.")
                         continue
                     
-                    # Parse HTML
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    images = soup.find_all('img')
-                    
-                    log_message(f"Found {len(images)} image tags. Filtering valid images...")
-                    
-                    valid_images = []
-                    for img in images:
-                        img_url = img.get('src') or img.get('data-src')
-                        if img_url:
-                            # Convert relative URLs to absolute
-                            if img_url.startswith('//'):
-                                img_url = 'https:' + img_url
-                            elif img_url.startswith('/'):
-                                img_url = 'https://simpcity.cr' + img_url
-                            valid_images.append(img_url)
+                    # Only post bodies are searched; headers and avatars are skipped
+                    valid_images = extract_image_urls(response.text)
                     
                     log_message(f"Processing {len(valid_images)} image URLs...")
                     
                     page_downloaded = 0
                     for idx, img_url in enumerate(valid_images):
                         try:
-                            if is_valid_image(img_url):
-                                # Download with proper headers
-                                img_headers = session.headers.copy()
-                                img_headers['Referer'] = url
-                                img_headers['Accept'] = 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8'
-                                
-                                img_response = session.get(img_url, timeout=15, headers=img_headers)
-                                
-                                if img_response.status_code == 200:
-                                    filename = f"image_{len(os.listdir(combined_output_dir)) + 1}.jpg"
-                                    filepath = os.path.join(combined_output_dir, filename)
-                                    
-                                    with open(filepath, 'wb') as f:
-                                        f.write(img_response.content)
-                                    
-                                    page_downloaded += 1
-                                    total_downloaded += 1
-                                    log_message(f"  ✓ Downloaded: {filename} ({page_downloaded} on this page)")
-                                    
-                                else:
-                                    log_message(f"  ✗ Failed: HTTP {img_response.status_code}")
+                            # Download with proper headers; the size check reads
+                            # only the header, and a passing image is kept whole
+                            img_headers = session.headers.copy()
+                            img_headers['Referer'] = url
+                            img_headers['Accept'] = 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8'
+                            
+                            filename = allocator.next_name()
+                            filepath = os.path.join(combined_output_dir, filename)
+                            
+                            def fetch_image():
+                                limiter.wait(img_url, "image")
+                                try:
+                                    written = save_valid_image(session, img_url, filepath, headers=img_headers)
+                                except requests.HTTPError as e:
+                                    limiter.feedback(img_url, e.response.status_code, "image",
+                                                     e.response.headers.get('Retry-After'))
+                                    raise
+                                limiter.feedback(img_url, 200, "image")
+                                return written
+                            
+                            written = retry.call(fetch_image, on_retry=log_retry)
+                            
+                            if written is not None:
+                                page_downloaded += 1
+                                total_downloaded += 1
+                                log_message(f"  ✓ Downloaded: {filename} ({page_downloaded} on this page)")
+                        except requests.HTTPError as e:
+                            log_message(f"  ✗ Failed: {e}")
+                            retry_later.add(url)
                         except Exception as e:
                             log_message(f"  ✗ Error downloading: {str(e)[:50]}")
+                            retry_later.add(url)
                         
                         # Update progress
                         progress = ((idx + 1) / len(valid_images)) * 100
-                        frame.after(0, lambda val=progress: progress_bar.configure(value=val))
                         status_text = page_status(idx + 1, len(valid_images), current_page, total_pages)
-                        frame.after(0, lambda st=status_text: progress_label.config(text=st))
-                        
-                        # Small delay between images
-                        time.sleep(0.2)
+                        events.progress(progress, status_text)
                     
                     log_message(f"Page complete: {page_downloaded} images downloaded")
-                    
-                    # Delay between pages
-                    if current_page < total_pages:
-                        log_message("Waiting 2 seconds before next page...")
-                        time.sleep(2)
                 
                 except Exception as e:
                     log_message(f"ERROR on page {current_page}: {str(e)}")
+                    retry_later.add(url)
+
+            retry_later.save()
 
             log_message(f"\n{'='*50}")
             log_message(f"DOWNLOAD COMPLETE!")
             log_message(f"Total images downloaded: {total_downloaded}")
             log_message(f"Saved to: {combined_output_dir}")
+            if len(retry_later):
+                log_message(f"Pages needing another pass: {len(retry_later)} (see {retry_later.path})")
             log_message(f"{'='*50}")
 
         except FileNotFoundError as e:
@@ -342,8 +307,7 @@ NOTE: Cookies expire! If download fails, extract fresh cookies.
             log_message(traceback.format_exc())
 
         finally:
-            download_in_progress[0] = False
-            frame.after(0, lambda: start_button.config(state="normal"))
+            events.publish("finished")
 
     def page_status(current_img, total_img, current_page, total_pages):
         return f"Page {current_page}/{total_pages}: {current_img}/{total_img} images"
@@ -0,0 +1,412 @@
+"""
+Async Download Engine
+asyncio/aiohttp alternative to the hybrid engine. Page and image fetches all
+run on one event loop, bounded by per-host semaphores instead of OS threads,
+so thousands of requests can be in flight at once.
+
+Select it with "engine": "async" in config/config.json. The engine knows
+nothing about Tk: progress is reported through the log and progress
+callbacks passed to run_async_download, which the caller must make safe to
+call from the engine's thread.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import aiohttp
+
+from engine_config import dedupe_mode, load_download_job
+from http_client import CONNECT_TIMEOUT, READ_TIMEOUT, DEFAULT_HEADERS, load_cookies, scoped_cookies
+from image_utils import ImageWriter, PROBE_LIMIT, CHUNK_SIZE
+from file_utils import group_by_folder
+from pagination import PastLastPage, page_number
+from bookkeeping import ThreadBook
+from dedupe import HashIndex, new_hasher
+from page_cache import open_page_cache
+from browser_pool import BrowserPool
+from rate_limit import AdaptiveRateLimiter
+from retry_utils import RetryPolicy
+
+# aiohttp transport errors worth another attempt
+ASYNC_RETRYABLE = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+
+
+class AsyncRun:
+    """
+    One async download run: the HTTP session and the limits every thread's
+    engine shares on the event loop (requests in flight, per host, pages
+    and streaming buffers), along with cookies, pacing, the retry budget,
+    the hash index, the page cache and the browser. Chromium starts and
+    loads the cookies at most once however many threads are queued.
+
+    Up to max_parallel_threads engines run at once, started in queue order
+    as slots free up, so a long thread cannot hold up the short ones queued
+    behind it.
+    """
+
+    def __init__(self, config, cookies, log, progress):
+        mode = dedupe_mode(config)
+        self.config = config
+        self.cookies = cookies
+        self.log = log
+        self.progress = progress
+
+        self.max_in_flight = int(config.get("async_max_in_flight", 1024))
+        self.per_host = int(config.get("async_per_host", 32))
+        self.page_concurrency = int(config.get("async_page_concurrency", 4))
+        memory_budget = float(config.get("memory_budget_mb", 64)) * 1024 * 1024
+        # Each streaming download holds at most one probe buffer plus a chunk
+        self.memory_slot_count = max(1, int(memory_budget // (PROBE_LIMIT + CHUNK_SIZE)))
+        self.max_parallel_threads = max(1, int(config.get("max_parallel_threads", 3)))
+
+        self.limiter = AdaptiveRateLimiter(
+            page_rate=config.get("page_rate", 1.0),
+            image_rate=config.get("image_rate", 8.0)
+        )
+        self.retry = RetryPolicy(
+            max_attempts=config.get("retry_attempts", 4),
+            base_delay=config.get("retry_base_delay", 1.0),
+            max_delay=config.get("retry_max_delay", 30.0),
+            budget=config.get("retry_budget", 200)
+        )
+        os.makedirs(config["output_directory"], exist_ok=True)
+        self.hash_index = HashIndex(config["output_directory"]) if mode != "off" else None
+        self.page_cache = open_page_cache(config)
+
+        # Playwright's sync API must stay on one thread
+        self.browser = BrowserPool(cookies)
+        self.browser_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="simpdl-browser")
+        self.engines = []
+
+    def host_slot(self, url):
+        host = urlparse(url).netloc.lower()
+        slot = self.host_slots.get(host)
+        if slot is None:
+            slot = self.host_slots[host] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    def report(self):
+        """Report progress across every engine of the run."""
+        pages_done = sum(engine.pages_done for engine in self.engines)
+        total_pages = sum(engine.total_pages for engine in self.engines)
+        completed = sum(engine.images_completed for engine in self.engines)
+        total = sum(engine.images_total for engine in self.engines)
+        percent = (completed / total) * 100 if total else 0
+        self.progress(percent, f"Pages {pages_done}/{total_pages}: {completed}/{total} images")
+
+    async def download(self, engines):
+        """Run engines to completion on this loop. Returns the number of images saved."""
+        self.engines = engines
+        # Semaphores belong to the running loop, so create them here
+        self.host_slots = {}
+        self.page_slots = asyncio.Semaphore(self.page_concurrency)
+        self.memory_slots = asyncio.Semaphore(self.memory_slot_count)
+        thread_slots = asyncio.Semaphore(self.max_parallel_threads)
+
+        async def run_engine(engine):
+            async with thread_slots:
+                try:
+                    return await engine.run()
+                except Exception as e:
+                    self.log(f"ERROR in thread {engine.name}: {str(e)}")
+                    return engine.total_downloaded
+
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+        async with aiohttp.ClientSession(headers=DEFAULT_HEADERS, timeout=timeout,
+                                         connector=connector) as session:
+            session.cookie_jar.update_cookies(scoped_cookies(self.cookies))
+            self.session = session
+            totals = await asyncio.gather(*(run_engine(engine) for engine in engines))
+        return sum(totals)
+
+    def close(self):
+        try:
+            self.browser_executor.submit(self.browser.close).result()
+        except Exception as e:
+            self.log(f"Browser shutdown failed: {e}")
+        self.browser_executor.shutdown()
+        if self.hash_index:
+            self.hash_index.close()
+        if self.page_cache:
+            self.page_cache.close()
+
+
+class AsyncDownloadEngine:
+    """
+    Downloads one forum thread into its own folder, on the run's event
+    loop and within the run's shared limits.
+    """
+
+    def __init__(self, shared, name, urls, queue_store=None, labelled=False):
+        config = shared.config
+        self.shared = shared
+        self.name = name
+        # Page lines name their thread when several run side by side
+        self.tag = f"{name} · " if labelled else ""
+        self.log = shared.log
+        self.combined_output_dir = os.path.join(config["output_directory"], name)
+        self.book = ThreadBook(config, self.combined_output_dir, urls, self.log, queue_store,
+                               shared.hash_index, shared.page_cache, self.tag)
+        # The book's list, which grows as the pager learns the thread's length
+        self.urls = self.book.urls
+
+        # Waiters on the shared limits are served in turn, so each thread may
+        # only queue its share of them: a long thread cannot line up ahead
+        # of every request of the threads beside it
+        self.page_concurrency = shared.page_concurrency
+        self.image_backlog = max(1, shared.max_in_flight // shared.max_parallel_threads)
+
+        self.limiter = shared.limiter
+        self.retry = shared.retry
+        self.browser = shared.browser
+        self.browser_executor = shared.browser_executor
+
+        self.total_pages = len(self.urls)
+        self.pages_done = 0
+        self.images_total = 0
+        self.images_completed = 0
+        self.total_downloaded = 0
+
+    def _report(self):
+        self.shared.report()
+
+    def _log_retry(self, attempt, delay, reason):
+        self.log(f"  ↻ Page fetch failed ({reason}), retry {attempt} in {delay:.1f}s")
+
+    async def run(self):
+        # This thread's own limits, taken before the run's shared ones
+        self.page_slots = asyncio.Semaphore(self.page_concurrency)
+        self.image_slots = asyncio.Semaphore(self.image_backlog)
+        self.session = self.shared.session
+        try:
+            await self._run_pages()
+        finally:
+            await asyncio.to_thread(self.book.close)
+        return self.total_downloaded
+
+    async def _run_pages(self):
+        # ThreadBook calls that read or write the journal, queue store or
+        # page cache run in worker threads, off the event loop
+        self.book.start()
+        # Pages are fetched concurrently but handed out in queue order, so
+        # filenames are still reserved in post order.
+        page_tasks = [
+            asyncio.ensure_future(self._fetch_page(index, url))
+            for index, url in enumerate(self.urls, 1)
+        ]
+        page_jobs = []
+        index = 0
+        while index < len(self.urls):
+            url, task = self.urls[index], page_tasks[index]
+            index += 1
+            self.log(f"\n[{self.tag}Page {index}/{self.total_pages}] Processing: {url}")
+            try:
+                fetched = await task
+            except PastLastPage as e:
+                self.log(str(e))
+                await asyncio.to_thread(self.book.set_state, url, "done")
+                self.pages_done += 1
+                continue
+            except Exception as e:
+                self.log(f"ERROR on page {index}: {str(e)}")
+                await asyncio.to_thread(self.book.page_failed, url)
+                self.pages_done += 1
+                continue
+            if fetched is None:
+                self.log("Already complete in journal, skipping")
+                await asyncio.to_thread(self.book.set_state, url, "done")
+                self.pages_done += 1
+                continue
+            html, unchanged = fetched
+
+            added = await asyncio.to_thread(self.book.learn, html)
+            if added:
+                self.total_pages = len(self.urls)
+                page_tasks += [
+                    asyncio.ensure_future(self._fetch_page(new_index, new_url))
+                    for new_index, new_url in enumerate(self.urls[-added:], self.total_pages - added + 1)
+                ]
+
+            if await asyncio.to_thread(self.book.skip_unchanged, url, unchanged):
+                self.pages_done += 1
+                continue
+
+            image_urls, pending, post_id = await asyncio.to_thread(self.book.plan_page, url, html)
+            self.log(f"{self.tag}Page {index}: found {len(image_urls)} images, {len(pending)} to download")
+
+            names = self.book.allocator.reserve(len(pending))
+            self.images_total += len(pending)
+            image_tasks = [
+                asyncio.ensure_future(self._fetch_image(img_url, url, filename))
+                for img_url, filename in zip(pending, names)
+            ]
+            page_jobs.append(asyncio.ensure_future(
+                self._finish_page(index, url, image_tasks, len(image_urls), post_id)
+            ))
+            self._report()
+
+        await asyncio.gather(*page_jobs)
+
+    async def _fetch_page(self, index, url):
+        """
+        Return (html, unchanged) for the page, or None if the journal says
+        it is done. unchanged is True if the page matches the cached copy.
+        """
+        if await asyncio.to_thread(self.book.already_done, url):
+            return None
+
+        # Use browser ONLY for page 1 or pages without /page-X
+        is_first_page = page_number(url) == 1
+        async with self.page_slots, self.shared.page_slots:
+            # Checked once a slot is free, by when page one has usually been read
+            self.book.pager.check(url)
+            await asyncio.to_thread(self.book.set_state, url, "running")
+            if is_first_page:
+                html = await self.retry.call_async(
+                    lambda: self._browser_page(url),
+                    on_retry=self._log_retry,
+                    retry_on=(Exception,)
+                )
+                return html, await asyncio.to_thread(self.book.remember_page, url, html)
+            return await self.retry.call_async(
+                lambda: self._request_page(url),
+                on_retry=self._log_retry,
+                retry_on=ASYNC_RETRYABLE
+            )
+
+    async def _browser_page(self, url):
+        await self.limiter.wait_async(url, "page")
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.browser_executor, self.browser.fetch, url)
+
+    async def _request_page(self, url):
+        # A cached page is only sent again if the server says it changed
+        cached = await asyncio.to_thread(self.book.cached_page, url)
+        async with self.shared.host_slot(url):
+            # Redirects are looked at before following: a page past the end
+            # of the thread bounces back to the last one, which we already have.
+            target, follow = url, False
+            validators = cached.conditional_headers() if cached else None
+            while True:
+                await self.limiter.wait_async(target, "page")
+                async with self.session.get(target, headers=validators, allow_redirects=follow) as response:
+                    pause = self.limiter.feedback(target, response.status, "page", response.headers.get("Retry-After"))
+                    if pause:
+                        self.log(f"⏳ Server pushed back (HTTP {response.status}), slowing down for {pause:.1f}s")
+                    if response.status == 304 and cached:
+                        await asyncio.to_thread(self.book.not_modified, url)
+                        return cached.body, True
+                    if not follow and response.status in (301, 302, 303, 307, 308):
+                        target = urljoin(url, response.headers.get("Location", ""))
+                        self.book.pager.check_redirect(url, target)
+                        follow, validators = True, None
+                        continue
+                    response.raise_for_status()
+                    html = await response.text()
+                    return html, await asyncio.to_thread(self.book.remember_page, url, html, response.headers)
+
+    async def _finish_page(self, index, url, image_tasks, image_count, post_id):
+        results = await asyncio.gather(*image_tasks, return_exceptions=True)
+        failed = sum(1 for r in results if isinstance(r, Exception))
+        downloaded = sum(1 for r in results if r and not isinstance(r, Exception) and not r[1])
+        self.pages_done += 1
+        await asyncio.to_thread(self.book.finish_page, index, url, image_count, post_id, failed, downloaded)
+        self._report()
+
+    async def _fetch_image(self, img_url, page_url, filename):
+        """
+        Validate and save one image. Returns (filename, duplicate_of), or
+        None if the image was rejected.
+        """
+        filepath = os.path.join(self.combined_output_dir, filename)
+        try:
+            async with self.image_slots:
+                written, hasher = await self.retry.call_async(
+                    lambda: self._save_image(img_url, page_url, filepath),
+                    retry_on=ASYNC_RETRYABLE
+                )
+        except Exception as e:
+            if await asyncio.to_thread(self.book.image_failed, img_url, page_url, e):
+                return None
+            self.log(f"  ✗ Error: {str(e)[:50]}")
+            raise
+        finally:
+            self.images_completed += 1
+            self._report()
+
+        result = await asyncio.to_thread(self.book.image_saved, img_url, page_url, filename, written,
+                                         hasher.hexdigest() if hasher else None)
+        if self.book.report_image(result):
+            self.total_downloaded += 1
+        return result
+
+    async def _save_image(self, img_url, page_url, filepath):
+        if img_url.startswith("data:") or not img_url.startswith("http"):
+            return None, None
+
+        # Fresh hasher per attempt so a retried stream hashes cleanly
+        hasher = new_hasher() if self.book.hash_index else None
+        async with self.shared.host_slot(img_url), self.shared.memory_slots:
+            await self.limiter.wait_async(img_url, "image")
+            async with self.session.get(img_url, headers={'Referer': page_url}) as response:
+                self.limiter.feedback(img_url, response.status, "image", response.headers.get("Retry-After"))
+                response.raise_for_status()
+                written = await self._stream_to_file(response, ImageWriter(filepath, hasher=hasher))
+        return written, hasher
+
+    async def _stream_to_file(self, response, writer):
+        """
+        Feed the response to writer as image_utils.save_valid_image does.
+        Only the header probe runs on the event loop: writes, fsync and the
+        PIL fallback go to worker threads.
+        """
+        try:
+            chunks = response.content.iter_chunked(CHUNK_SIZE)
+            async for chunk in chunks:
+                if writer.probe(chunk):
+                    break
+            if writer.too_small():
+                return None
+
+            await asyncio.to_thread(writer.open)
+            async for chunk in chunks:
+                await asyncio.to_thread(writer.write, chunk)
+            return await asyncio.to_thread(writer.finish)
+        except BaseException:
+            writer.discard()
+            raise
+
+
+def run_async_download(config_path, urls_file, log, progress, overrides=None, cookie_file=None):
+    """
+    Run the async engine to completion on the calling thread.
+
+    log(message) and progress(percent, status_text) are called from this
+    thread. overrides and cookie_file are passed on to
+    load_download_job. Returns (images_downloaded, thread_folders).
+
+    Each thread in the queue gets its own engine and folder; they run side
+    by side on one event loop, sharing one AsyncRun.
+    """
+    config, urls, cookie_data, queue_store = load_download_job(
+        config_path, urls_file, overrides, cookie_file
+    )
+    groups = group_by_folder(urls)
+    shared = None
+    try:
+        shared = AsyncRun(config, load_cookies(cookie_data), log, progress)
+        engines = [AsyncDownloadEngine(shared, name, thread_urls, queue_store, labelled=len(groups) > 1)
+                   for name, thread_urls in groups]
+        log(f"Async engine: up to {shared.max_in_flight} requests in flight ({shared.per_host} per host)")
+        if len(engines) > 1:
+            log(f"{len(engines)} threads queued, downloading up to "
+                f"{min(shared.max_parallel_threads, len(engines))} at a time")
+        total = asyncio.run(shared.download(engines))
+    finally:
+        if shared:
+            shared.close()
+        queue_store.close()
+    return total, [engine.combined_output_dir for engine in engines]
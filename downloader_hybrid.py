@@ -1,15 +1,13 @@
 import os
-import time
 import json
-import requests
 import tkinter as tk
 import threading
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
 
-from image_utils import is_valid_image
+from engine_config import ConfigError
+from event_bus import EventBus, coalesce
+from log_view import LogView, FILTERS, DEFAULT_MAX_LINES
 
 def build_download_frame(parent, config_path, urls_file):
     """Premium download interface."""
@@ -87,13 +85,37 @@ def build_download_frame(parent, config_path, urls_file):
     progress_bar.pack(fill="x", pady=(15, 0))
 
     # Log section
+    log_header = tb.Frame(content, bootstyle="dark")
+    log_header.pack(fill="x", pady=(0, 10))
+
     log_label = tb.Label(
-        content,
+        log_header,
         text="Activity Log",
         font=("Helvetica", 11, "bold"),
         foreground="#e2e8f0"
     )
-    log_label.pack(anchor="w", pady=(0, 10))
+    log_label.pack(side="left")
+
+    collapse_var = tk.BooleanVar(value=True)
+    collapse_check = tb.Checkbutton(
+        log_header,
+        text="Collapse image lines",
+        variable=collapse_var,
+        bootstyle="success-round-toggle",
+        command=lambda: log_view.set_collapse(collapse_var.get())
+    )
+    collapse_check.pack(side="right")
+
+    filter_var = tk.StringVar(value="All")
+    filter_combo = tb.Combobox(
+        log_header,
+        textvariable=filter_var,
+        values=list(FILTERS),
+        state="readonly",
+        width=14
+    )
+    filter_combo.pack(side="right", padx=(0, 15))
+    filter_combo.bind("<<ComboboxSelected>>", lambda e: log_view.set_filter(filter_var.get()))
 
     log_container = tb.Frame(content, bootstyle="secondary")
     log_container.pack(fill="both", expand=True, pady=(0, 20))
@@ -111,11 +133,43 @@ def build_download_frame(parent, config_path, urls_file):
     )
     log_text.pack(fill="both", expand=True)
 
+    # The widget keeps the last log_max_lines lines; everything is also
+    # written to config/logs/activity.log
+    try:
+        with open(config_path, "r") as f:
+            max_lines = json.load(f).get("log_max_lines", DEFAULT_MAX_LINES)
+    except (FileNotFoundError, json.JSONDecodeError):
+        max_lines = DEFAULT_MAX_LINES
+    log_path = os.path.join(os.path.dirname(config_path), "logs", "activity.log")
+    log_view = LogView(log_text, max_lines, log_path)
+
     download_in_progress = [False]
 
+    # Every update goes through the bus, whichever thread it comes from;
+    # only apply_events, on the Tk thread, touches the widgets.
+    events = EventBus()
+
     def log_message(msg):
-        log_text.insert(tk.END, msg + "\n")
-        log_text.see(tk.END)
+        events.log(msg)
+
+    def apply_events(batch):
+        lines, latest = coalesce(batch)
+        if lines:
+            log_view.append(lines)
+        if "progress" in latest:
+            percent, status_text = latest["progress"]
+            progress_bar.configure(value=percent)
+            progress_label.config(text=status_text)
+        if "status" in latest:
+            color, label, detail = latest["status"]
+            status_indicator.config(foreground=color)
+            progress_label.config(text=label)
+            progress_detail.config(text=detail)
+        if "finished" in latest:
+            download_in_progress[0] = False
+            start_button.config(state="normal", text="▶️ Start Download")
+
+    events.pump(frame, apply_events)
 
     def start_download():
         if download_in_progress[0]:
@@ -126,224 +180,58 @@ def build_download_frame(parent, config_path, urls_file):
         status_indicator.config(foreground="#10b981")
         progress_label.config(text="In Progress")
         progress_detail.config(text="Downloading files...")
+        engine = get_engine_name()
         log_message("=" * 70)
-        log_message("⚡ STARTING HYBRID DOWNLOAD ENGINE")
+        log_message(f"⚡ STARTING {engine.upper()} DOWNLOAD ENGINE")
         log_message("=" * 70)
 
-        threading.Thread(target=run_download, daemon=True).start()
-
-    def download_page_with_browser(url, output_dir):
-        """Use browser for a single page (page 1 only)"""
-        log_message(f"🌐 Opening browser for: {url}")
-        
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        cookie_file = os.path.join(script_dir, "config", "manual_cookies.json")
-        
-        with open(cookie_file, "r") as f:
-            cookie_data = json.load(f)
-        
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context()
-            
-            # Set cookies
-            if "parsed_cookies" in cookie_data:
-                cookies_to_set = []
-                for name, value in cookie_data["parsed_cookies"].items():
-                    cookies_to_set.append({
-                        'name': name,
-                        'value': value,
-                        'domain': '.simpcity.cr',
-                        'path': '/'
-                    })
-                context.add_cookies(cookies_to_set)
-            
-            page = context.new_page()
-            page.goto(url, wait_until='networkidle', timeout=60000)
-            time.sleep(3)
-            
-            # Scroll to load images
-            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            time.sleep(2)
-            
-            html = page.content()
-            browser.close()
-            
-            return html
-
-    def download_page_with_requests(session, url):
-        """Use requests for pages 2+"""
-        response = session.get(url, timeout=30)
-        if response.status_code == 200:
-            return response.text
-        return None
-
-    def run_download():
+        threading.Thread(target=run_download, args=(engine,), daemon=True).start()
+
+    def get_engine_name():
+        """Backend chosen by the "engine" config key: "hybrid" or "async"."""
         try:
             with open(config_path, "r") as f:
-                config = json.load(f)
-            output_directory = config.get("output_directory", "")
-            
-            if not output_directory:
-                log_message("ERROR: No output directory set!")
-                log_message("Please go to 'Download Settings' and set a download folder.")
-                return
-
-            with open(urls_file, "r") as file:
-                urls = [line.strip() for line in file if line.strip()]
-
-            if not urls:
-                log_message("No URLs found. Please add URLs first.")
-                return
-
-            script_dir = os.path.dirname(os.path.realpath(__file__))
-            cookie_file = os.path.join(script_dir, "config", "manual_cookies.json")
-            
-            if not os.path.exists(cookie_file):
-                log_message("ERROR: manual_cookies.json not found!")
-                return
-            
-            with open(cookie_file, "r") as f:
-                cookie_data = json.load(f)
-            
-            if "cookie_header" in cookie_data:
-                cookie_header = cookie_data.get("cookie_header", "")
+                return json.load(f).get("engine", "hybrid")
+        except (FileNotFoundError, json.JSONDecodeError):
+            return "hybrid"
+
+    def show_complete(total_downloaded, output_dirs):
+        log_message(f"\n{'='*60}")
+        log_message(f"✅ DOWNLOAD COMPLETE!")
+        log_message(f"{'='*60}")
+        log_message(f"📊 Total images downloaded: {total_downloaded}")
+        for output_dir in output_dirs:
+            log_message(f"📁 Saved to: {output_dir}")
+        log_message(f"{'='*60}")
+        events.publish("status", "#00ff00", "Download complete!", f"{total_downloaded} images saved successfully")
+
+    def show_failed(e):
+        log_message(f"\n{'='*60}")
+        log_message(f"❌ ERROR: {str(e)}")
+        log_message(f"{'='*60}")
+        import traceback
+        log_message(traceback.format_exc())
+        events.publish("status", "#dc3545", "Download failed", "Check log for details")
+
+    def run_download(engine):
+        """Run the chosen engine; its callbacks publish to the event bus."""
+        try:
+            # Engines are imported on first run so requests, aiohttp and
+            # friends stay out of the way of the window opening
+            if engine == "async":
+                from downloader_async import run_async_download as run_engine
             else:
-                cookie_header = None
-
-            folder_name = get_folder_name(urls[0])
-            combined_output_dir = os.path.join(output_directory, folder_name)
-            if not os.path.exists(combined_output_dir):
-                os.makedirs(combined_output_dir)
-
-            # Setup requests session for pages 2+
-            session = requests.Session()
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Referer': 'https://simpcity.cr/'
-            }
-            
-            if cookie_header:
-                headers['Cookie'] = cookie_header
-            
-            session.headers.update(headers)
-
-            total_pages = len(urls)
-            total_downloaded = 0
-
-            for current_page, url in enumerate(urls, 1):
-                log_message(f"\n[Page {current_page}/{total_pages}] Processing: {url}")
-                
-                # Use browser ONLY for page 1 or pages without /page-X
-                is_first_page = (current_page == 1 and '/page-' not in url) or '/page-1' in url
-                
-                try:
-                    if is_first_page:
-                        log_message("Using BROWSER method (bypasses page 1 protection)...")
-                        html_content = download_page_with_browser(url, combined_output_dir)
-                    else:
-                        log_message("Using REQUESTS method (fast)...")
-                        time.sleep(2)
-                        html_content = download_page_with_requests(session, url)
-                    
-                    if not html_content:
-                        log_message("Failed to fetch page content")
-                        continue
-                    
-                    # Parse HTML
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    images = soup.find_all('img')
-                    
-                    log_message(f"Found {len(images)} image tags. Processing...")
-                    
-                    valid_images = []
-                    for img in images:
-                        img_url = img.get('src') or img.get('data-src')
-                        if img_url:
-                            if img_url.startswith('//'):
-                                img_url = 'https:' + img_url
-                            elif img_url.startswith('/'):
-                                img_url = 'https://simpcity.cr' + img_url
-                            valid_images.append(img_url)
-                    
-                    page_downloaded = 0
-                    for idx, img_url in enumerate(valid_images):
-                        try:
-                            if is_valid_image(img_url):
-                                img_headers = session.headers.copy()
-                                img_headers['Referer'] = url
-                                
-                                img_response = session.get(img_url, timeout=15, headers=img_headers)
-                                
-                                if img_response.status_code == 200:
-                                    filename = f"image_{len(os.listdir(combined_output_dir)) + 1}.jpg"
-                                    filepath = os.path.join(combined_output_dir, filename)
-                                    
-                                    with open(filepath, 'wb') as f:
-                                        f.write(img_response.content)
-                                    
-                                    page_downloaded += 1
-                                    total_downloaded += 1
-                                    log_message(f"  ✓ Downloaded: {filename}")
-                                    
-                        except Exception as e:
-                            log_message(f"  ✗ Error: {str(e)[:50]}")
-                        
-                        progress = ((idx + 1) / len(valid_images)) * 100
-                        frame.after(0, lambda val=progress: progress_bar.configure(value=val))
-                        status_text = page_status(idx + 1, len(valid_images), current_page, total_pages)
-                        frame.after(0, lambda st=status_text: progress_label.config(text=st))
-                        
-                        time.sleep(0.2)
-                    
-                    log_message(f"Page complete: {page_downloaded} images downloaded")
-                
-                except Exception as e:
-                    log_message(f"ERROR on page {current_page}: {str(e)}")
-
-            log_message(f"\n{'='*60}")
-            log_message(f"✅ DOWNLOAD COMPLETE!")
-            log_message(f"{'='*60}")
-            log_message(f"📊 Total images downloaded: {total_downloaded}")
-            log_message(f"📁 Saved to: {combined_output_dir}")
-            log_message(f"{'='*60}")
-            
-            frame.after(0, lambda: status_indicator.config(foreground="#00ff00"))
-            frame.after(0, lambda: progress_label.config(text="Download complete!"))
-            frame.after(0, lambda: progress_detail.config(text=f"{total_downloaded} images saved successfully"))
-
+                from hybrid_engine import run_hybrid_download as run_engine
+            total_downloaded, output_dirs = run_engine(
+                config_path, urls_file, events.log, events.progress
+            )
+            show_complete(total_downloaded, output_dirs)
+        except ConfigError as e:
+            log_message(f"ERROR: {e}")
         except Exception as e:
-            log_message(f"\n{'='*60}")
-            log_message(f"❌ ERROR: {str(e)}")
-            log_message(f"{'='*60}")
-            import traceback
-            log_message(traceback.format_exc())
-            
-            frame.after(0, lambda: status_indicator.config(foreground="#dc3545"))
-            frame.after(0, lambda: progress_label.config(text="Download failed"))
-            frame.after(0, lambda: progress_detail.config(text="Check log for details"))
-
+            show_failed(e)
         finally:
-            download_in_progress[0] = False
-            frame.after(0, lambda: start_button.config(state="normal", text="▶️ Start Download"))
-
-    def page_status(current_img, total_img, current_page, total_pages):
-        return f"Page {current_page}/{total_pages}: {current_img}/{total_img} images"
-
-    def get_folder_name(url):
-        url = url.rstrip('/')
-        parts = url.split('/')
-        if 'threads' in parts:
-            idx = parts.index('threads')
-            if idx + 1 < len(parts):
-                folder = parts[idx + 1]
-                if folder.startswith('page-'):
-                    if idx + 2 < len(parts):
-                        folder = parts[idx + 2]
-                return folder.split('?')[0]
-        return "default_folder"
+            events.publish("finished")
 
     # Control buttons
     button_frame = tb.Frame(frame, bootstyle="dark")
@@ -358,7 +246,7 @@ def build_download_frame(parent, config_path, urls_file):
     start_button.pack(side="left", padx=5, ipadx=20, ipady=10)
 
     def clear_log():
-        log_text.delete(1.0, tk.END)
+        log_view.clear()
         progress_bar.configure(value=0)
         status_indicator.config(foreground="#ffc107")
         progress_label.config(text="Ready to download")
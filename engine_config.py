@@ -0,0 +1,77 @@
+"""
+Engine Configuration
+Loads the settings, URL queue and cookies every download engine starts from.
+"""
+
+import json
+import os
+
+from dedupe import DEDUPE_MODES
+from queue_store import open_queue, queue_path
+
+
+class ConfigError(Exception):
+    """The job cannot start. The message is meant for the user."""
+
+
+def dedupe_mode(config):
+    """config's dedupe_mode, which must be one of DEDUPE_MODES."""
+    mode = config.get("dedupe_mode", "hardlink")
+    if mode not in DEDUPE_MODES:
+        raise ConfigError(f"Unknown dedupe_mode {mode!r}: use one of {', '.join(DEDUPE_MODES)}")
+    return mode
+
+
+def get_cookie_file():
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(script_dir, "config", "manual_cookies.json")
+
+
+def read_json(path):
+    """Parse a JSON settings file, raising ConfigError if it is missing or malformed."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise ConfigError(f"{os.path.basename(path)} not found: {path}")
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"{os.path.basename(path)} is not valid JSON: {e}")
+
+
+def load_download_job(config_path, urls_file, overrides=None, cookie_file=None):
+    """
+    Read everything a download run needs.
+
+    overrides are config keys that win over config_path, which may then be
+    missing. Returns (config, urls, cookie_data, queue), queue being the
+    open QueueStore behind urls_file, which the caller closes; raises
+    ConfigError if the settings, output folder, queue or cookies are
+    missing or unreadable.
+    """
+    config = {}
+    if os.path.exists(config_path) or not overrides:
+        config = read_json(config_path)
+    config.update(overrides or {})
+    if not config.get("output_directory", ""):
+        raise ConfigError(
+            "No output directory set! "
+            "Please go to 'Download Settings' and set a download folder."
+        )
+
+    if not os.path.exists(urls_file) and not os.path.exists(queue_path(urls_file)):
+        raise ConfigError(f"URL list not found: {urls_file}")
+
+    cookie_file = cookie_file or get_cookie_file()
+    if not os.path.exists(cookie_file):
+        raise ConfigError(f"{os.path.basename(cookie_file)} not found!")
+    cookie_data = read_json(cookie_file)
+
+    queue = open_queue(urls_file)
+    urls = queue.urls()
+    if not urls:
+        queue.close()
+        raise ConfigError("No URLs found. Please add URLs first.")
+    # Pages a killed run left "running" are pending again
+    queue.recover()
+
+    return config, urls, cookie_data, queue
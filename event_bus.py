@@ -0,0 +1,70 @@
+"""
+Event Bus
+Thread-safe hand-off of log, progress and status updates from download
+threads to the GUI.
+
+Any thread publishes; the Tk thread drains the queue on a fixed tick and
+applies the whole batch at once. A busy run then costs the event loop one
+callback per tick instead of several per image, and no widget is ever
+touched from a worker thread.
+"""
+
+import queue
+
+DRAIN_INTERVAL_MS = 100
+# Upper bound on events applied in one tick, so a flood cannot stall the UI
+MAX_BATCH = 2000
+
+
+class EventBus:
+    """Queue of (kind, args) events, safe to publish to from any thread."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def publish(self, kind, *args):
+        self._queue.put((kind, args))
+
+    def log(self, message):
+        self.publish("log", message)
+
+    def progress(self, percent, status_text):
+        self.publish("progress", percent, status_text)
+
+    def drain(self, limit=MAX_BATCH):
+        """Take up to limit pending events without blocking."""
+        events = []
+        while len(events) < limit:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def pump(self, widget, apply, interval_ms=DRAIN_INTERVAL_MS):
+        """
+        Every interval_ms, on widget's (Tk) thread, call apply(events) with
+        whatever has been published since the last tick.
+        """
+        def tick():
+            events = self.drain()
+            if events:
+                apply(events)
+            widget.after(interval_ms, tick)
+
+        widget.after(interval_ms, tick)
+
+
+def coalesce(events):
+    """
+    Split a drained batch into its log lines, in order, and a dict of the
+    newest args for every other kind, since those supersede older ones.
+    """
+    lines = []
+    latest = {}
+    for kind, args in events:
+        if kind == "log":
+            lines.append(args[0])
+        else:
+            latest[kind] = args
+    return lines, latest
@@ -0,0 +1,77 @@
+"""
+File Utilities
+Naming and writing of downloaded files.
+"""
+
+import os
+import re
+import threading
+
+
+def get_folder_name(url):
+    """
+    Extract the portion after 'threads/' from the URL.
+    """
+    url = url.rstrip('/')
+    parts = url.split('/')
+    if 'threads' in parts:
+        idx = parts.index('threads')
+        if idx + 1 < len(parts):
+            # Remove page-X suffix if present
+            folder = parts[idx + 1]
+            if folder.startswith('page-'):
+                if idx + 2 < len(parts):
+                    folder = parts[idx + 2]
+            return folder.split('?')[0]  # Remove query params
+    return "default_folder"
+
+
+def group_by_folder(urls):
+    """
+    Split a queue into [(folder_name, urls)], one group per thread folder,
+    in the order each folder's first URL appears.
+    """
+    groups = {}
+    for url in urls:
+        groups.setdefault(get_folder_name(url), []).append(url)
+    return list(groups.items())
+
+
+class FilenameAllocator:
+    """
+    Hands out image_N names for one folder.
+
+    The folder is scanned once to find the highest N already used; after that
+    names come from an in-memory counter, so allocation is O(1) and safe to
+    call from several threads. Reserving a whole page's worth of names up
+    front keeps files in post order even when downloads finish out of order.
+    """
+
+    def __init__(self, directory, prefix="image_", extension=".jpg"):
+        self.prefix = prefix
+        self.extension = extension
+        self._pattern = re.compile(re.escape(prefix) + r"(\d+)\.")
+        self._next = self._highest_index(directory) + 1
+        self._lock = threading.Lock()
+
+    def _highest_index(self, directory):
+        highest = 0
+        if not os.path.isdir(directory):
+            return highest
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                match = self._pattern.match(entry.name)
+                if match:
+                    highest = max(highest, int(match.group(1)))
+        return highest
+
+    def reserve(self, count):
+        """Reserve count consecutive names and return them in order."""
+        with self._lock:
+            start = self._next
+            self._next += count
+        return [f"{self.prefix}{n}{self.extension}" for n in range(start, start + count)]
+
+    def next_name(self):
+        """Reserve a single name."""
+        return self.reserve(1)[0]
@@ -0,0 +1,290 @@
+"""
+HTML Extraction
+Pulls image URLs out of thread pages.
+
+Only post bodies (.message-body .bbWrapper) are searched, so header,
+sidebar, avatar, signature and reaction images never reach the downloaders.
+selectolax or lxml is used when installed; otherwise a stdlib tokenizer
+walks the page once without building a tree.
+
+Each image is resolved to its full-size source before anything is fetched:
+an attachment or lightbox thumbnail is replaced by the file it links to, and
+image-host thumbnail variants (name.md.jpg, name.th.jpg) by the original.
+Images are tagged with the ID of the post they belong to (the article's
+data-content="post-N"), so a rerun can skip posts it has already seen.
+"""
+
+import re
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, urlunsplit
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+SITE_ROOT = "https://simpcity.cr"
+POST_BODY_CLASS = "message-body"
+POST_CONTENT_CLASS = "bbWrapper"
+LIGHTBOX_CLASS = "js-lbImage"
+SMILIE_CLASS = "smilie"
+POST_ID_ATTR = "data-content"
+POST_ID_PATTERN = re.compile(r'data-content="post-(\d+)"')
+
+_HAS_CLASS = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+POST_IMAGES_XPATH = (
+    f"//*[{_HAS_CLASS.format(POST_BODY_CLASS)}]"
+    f"//*[{_HAS_CLASS.format(POST_CONTENT_CLASS)}]//img"
+)
+POST_IMAGES_CSS = f".{POST_BODY_CLASS} .{POST_CONTENT_CLASS} img"
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+# Chevereto-style hosts serve name.md.jpg (medium) and name.th.jpg (thumb)
+THUMBNAIL_VARIANT = re.compile(r"\.(?:md|th)(\.(?:jpe?g|png|gif|webp))$", re.IGNORECASE)
+
+
+def absolute_url(img_url):
+    """Make a src attribute absolute the way the downloaders always have."""
+    if img_url.startswith('//'):
+        return 'https:' + img_url
+    if img_url.startswith('/'):
+        return SITE_ROOT + img_url
+    return img_url
+
+
+def _post_id(value):
+    """N from a data-content="post-N" value, else None."""
+    if value and value.startswith("post-") and value[5:].isdigit():
+        return int(value[5:])
+    return None
+
+
+def max_post_id(html):
+    """Highest post ID on a thread page, or None if it has no posts."""
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    return max((int(n) for n in POST_ID_PATTERN.findall(html)), default=None)
+
+
+def _is_image_link(url):
+    """True if following url yields the image itself rather than a page."""
+    path = urlsplit(url).path.lower()
+    return "/attachments/" in path or path.endswith(IMAGE_EXTENSIONS)
+
+
+def _strip_thumbnail_variant(url):
+    parts = urlsplit(url)
+    path = THUMBNAIL_VARIANT.sub(r"\1", parts.path)
+    if path == parts.path:
+        return url
+    return urlunsplit(parts._replace(path=path))
+
+
+def resolve_full_size(attrs, link=None, lightbox=None):
+    """
+    Full-resolution URL for one <img>, or None if it is not a real image.
+
+    attrs are the img's attributes, link the href of the <a> around it and
+    lightbox the data-src of the lightbox wrapper around it, if any.
+    """
+    if SMILIE_CLASS in (attrs.get('class') or '').split():
+        return None
+
+    src = attrs.get('src')
+    if not src or src.startswith('data:'):
+        # Lazy-loaded images keep a placeholder in src
+        src = attrs.get('data-src')
+
+    candidates = [attrs.get('data-url'), lightbox]
+    if link and _is_image_link(link):
+        candidates.append(link)
+    candidates.append(src)
+
+    for url in candidates:
+        if url and not url.startswith('data:'):
+            return _strip_thumbnail_variant(absolute_url(url))
+    return None
+
+
+class _PostImageParser(HTMLParser):
+    """
+    Collects (attrs, link, lightbox, post_id) for every img inside
+    .message-body .bbWrapper.
+
+    Each container is tracked by counting nested tags of its own name only,
+    so stray unclosed <p> or <li> tags elsewhere cannot end it early.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.images = []
+        self._body = None      # [tag, depth] of the current .message-body
+        self._wrapper = None   # [tag, depth] of the current .bbWrapper
+        self._lightbox = None  # [tag, depth, data-src] of the current lightbox
+        self._links = []       # hrefs of the open <a> tags in the wrapper
+        self._post_id = None   # ID of the last post opened
+
+    def handle_starttag(self, tag, attrs):
+        if self._wrapper is not None:
+            self._post_starttag(tag, attrs)
+            return
+
+        for name, value in attrs:
+            if name == POST_ID_ATTR and _post_id(value) is not None:
+                self._post_id = _post_id(value)
+
+        classes = _classes(attrs)
+        if self._body is None:
+            if POST_BODY_CLASS in classes:
+                self._body = [tag, 1]
+            return
+
+        if tag == self._body[0]:
+            self._body[1] += 1
+        if POST_CONTENT_CLASS in classes:
+            self._wrapper = [tag, 1]
+
+    def _post_starttag(self, tag, attrs):
+        if tag == "img":
+            self._add_image(attrs)
+            return
+        if tag == "a":
+            self._links.append(dict(attrs).get("href"))
+        for container in (self._wrapper, self._body, self._lightbox):
+            if container is not None and tag == container[0]:
+                container[1] += 1
+        if self._lightbox is None and LIGHTBOX_CLASS in _classes(attrs):
+            self._lightbox = [tag, 1, dict(attrs).get("data-src")]
+
+    def _add_image(self, attrs):
+        link = self._links[-1] if self._links else None
+        lightbox = self._lightbox[2] if self._lightbox else None
+        self.images.append((dict(attrs), link, lightbox, self._post_id))
+
+    def handle_startendtag(self, tag, attrs):
+        # <img/> and friends: never containers, so no depth bookkeeping
+        if self._wrapper is not None and tag == "img":
+            self._add_image(attrs)
+
+    def handle_endtag(self, tag):
+        if self._wrapper is None:
+            if self._body is not None and tag == self._body[0]:
+                self._body[1] -= 1
+                if self._body[1] == 0:
+                    self._body = None
+            return
+
+        if tag == "a" and self._links:
+            self._links.pop()
+        if self._lightbox is not None and tag == self._lightbox[0]:
+            self._lightbox[1] -= 1
+            if self._lightbox[1] == 0:
+                self._lightbox = None
+        if tag == self._wrapper[0]:
+            self._wrapper[1] -= 1
+        if tag == self._body[0]:
+            self._body[1] -= 1
+        if self._wrapper[1] == 0 or self._body[1] == 0:
+            self._wrapper = None
+            self._lightbox = None
+            self._links = []
+            if self._body[1] == 0:
+                self._body = None
+
+
+def _classes(attrs):
+    for name, value in attrs:
+        if name == "class" and value:
+            return value.split()
+    return ()
+
+
+def _context(node, tag, attrs, parent):
+    """
+    Walk up from an img to its post and return (link, lightbox, post_id).
+    Links and lightboxes only count inside the post wrapper. tag, attrs and
+    parent read a node the way each tree library needs.
+    """
+    link = lightbox = post_id = None
+    in_wrapper = True
+    node = parent(node)
+    while node is not None:
+        node_attrs = attrs(node)
+        if in_wrapper:
+            classes = (node_attrs.get("class") or "").split()
+            if POST_CONTENT_CLASS in classes:
+                in_wrapper = False
+            else:
+                if link is None and tag(node) == "a":
+                    link = node_attrs.get("href")
+                if lightbox is None and LIGHTBOX_CLASS in classes:
+                    lightbox = node_attrs.get("data-src")
+        post_id = _post_id(node_attrs.get(POST_ID_ATTR))
+        if post_id is not None:
+            break
+        node = parent(node)
+    return link, lightbox, post_id
+
+
+def _images_stdlib(html):
+    parser = _PostImageParser()
+    parser.feed(html)
+    parser.close()
+    return parser.images
+
+
+def _images_selectolax(html):
+    images = []
+    for node in SelectolaxParser(html).css(POST_IMAGES_CSS):
+        context = _context(node, lambda n: n.tag, lambda n: n.attributes, lambda n: n.parent)
+        images.append((node.attributes,) + context)
+    return images
+
+
+def _images_lxml(html):
+    if not html.strip():
+        return []
+    images = []
+    for img in lxml.html.fromstring(html).xpath(POST_IMAGES_XPATH):
+        context = _context(img, lambda n: n.tag, lambda n: n.attrib, lambda n: n.getparent())
+        images.append((img.attrib,) + context)
+    return images
+
+
+BACKENDS = {"stdlib": _images_stdlib}
+if lxml is not None:
+    BACKENDS["lxml"] = _images_lxml
+if SelectolaxParser is not None:
+    BACKENDS["selectolax"] = _images_selectolax
+
+# Fastest available backend first
+DEFAULT_BACKEND = next(
+    name for name in ("selectolax", "lxml", "stdlib") if name in BACKENDS
+)
+
+
+def post_images(html, backend=None):
+    """(attrs, link, lightbox, post_id) for every <img> inside a post body, in page order."""
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    return BACKENDS[backend or DEFAULT_BACKEND](html)
+
+
+def extract_image_urls(html, backend=None, after_post=None):
+    """
+    Absolute, full-size, de-duplicated image URLs from a thread page's posts.
+    With after_post, posts with that ID or lower are left out.
+    """
+    image_urls = []
+    for attrs, link, lightbox, post_id in post_images(html, backend):
+        if after_post is not None and post_id is not None and post_id <= after_post:
+            continue
+        img_url = resolve_full_size(attrs, link, lightbox)
+        if img_url:
+            image_urls.append(img_url)
+    return list(dict.fromkeys(image_urls))
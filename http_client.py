@@ -0,0 +1,109 @@
+"""
+HTTP Client
+Every HTTP request SimpDL makes goes through a session built here, so they
+all share a sized connection pool, the same browser-like headers, the
+saved cookies and sane timeouts.
+
+The async engine cannot use a requests session, but takes its headers,
+cookies and timeouts from here as well.
+"""
+
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+SITE_URL = "https://simpcity.cr/"
+# Login cookies go to the forum and its subdomains only, never to image hosts
+COOKIE_DOMAIN = "." + urlsplit(SITE_URL).hostname
+
+# Headers a real browser sends. Accept-Encoding and Connection are left to
+# the HTTP libraries: they negotiate only what they can decode ("br" needs
+# the optional brotli package) and manage keep-alive themselves.
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'DNT': '1',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Cache-Control': 'max-age=0',
+    'sec-ch-ua': '"Google Chrome";v="131", "Chromium";v="131", "Not_A Brand";v="24"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+    'Referer': SITE_URL
+}
+
+CONNECT_TIMEOUT = 15
+READ_TIMEOUT = 30
+# Applied to any request made without its own timeout
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+
+def load_cookies(cookie_data):
+    """{name: value} for the contents of manual_cookies.json."""
+    if not cookie_data:
+        return {}
+    header = cookie_data.get("cookie_header")
+    if header:
+        cookies = {}
+        for part in header.split(";"):
+            name, sep, value = part.strip().partition("=")
+            if sep and name:
+                cookies[name] = value
+        return cookies
+    # Older files hold only the cookies, either parsed or at the top level
+    cookies = cookie_data.get("parsed_cookies", cookie_data)
+    return {name: value for name, value in cookies.items() if isinstance(value, str)}
+
+
+def scoped_cookies(cookies):
+    """cookies as a SimpleCookie limited to COOKIE_DOMAIN, for aiohttp's cookie jar."""
+    jar = SimpleCookie()
+    for name, value in cookies.items():
+        jar[name] = value
+        jar[name]["domain"] = COOKIE_DOMAIN
+        jar[name]["path"] = "/"
+    return jar
+
+
+def browser_cookies(cookies):
+    """cookies in the form Playwright's add_cookies takes, limited to COOKIE_DOMAIN."""
+    return [
+        {"name": name, "value": value, "domain": COOKIE_DOMAIN, "path": "/"}
+        for name, value in cookies.items()
+    ]
+
+
+class Session(requests.Session):
+    """A requests Session whose requests time out after timeout unless told otherwise."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def create_session(cookies=None, pool_size=8, per_host=4, timeout=DEFAULT_TIMEOUT):
+    """
+    A Session with DEFAULT_HEADERS, and cookies for COOKIE_DOMAIN, that keeps
+    connections to up to pool_size hosts alive, at most per_host to each.
+    Size per_host for the most requests the caller ever has in flight to
+    one host, or urllib3 throws the extra connections away after use.
+    """
+    session = Session(timeout)
+    adapter = HTTPAdapter(pool_connections=max(1, int(pool_size)), pool_maxsize=max(1, int(per_host)))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    for name, value in (cookies or {}).items():
+        session.cookies.set(name, value, domain=COOKIE_DOMAIN, path="/")
+    return session
+
@@ -0,0 +1,478 @@
+"""
+Hybrid Download Engine
+Browser for page 1, requests for everything after it. The work runs as a
+pipeline of stages joined by bounded queues:
+
+    page fetch  ->  parse  ->  image download (worker pool)  ->  results
+
+Page N+1 is fetched and parsed while page N's images are still downloading.
+When a downstream stage falls behind, its queue fills and the stage feeding
+it blocks, so nothing runs ahead of what the pool can absorb.
+
+A queue holding several threads is split into one job per thread, each
+with its own folder and pipeline; several jobs run at once on a shared pool.
+
+The engine knows nothing about Tk: progress is reported through the log and
+progress callbacks passed to run_hybrid_download, which the caller must make
+safe to call from any thread.
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+
+from engine_config import dedupe_mode, load_download_job
+from http_client import create_session, load_cookies
+from image_utils import save_valid_image
+from download_pool import DownloadPool, MemoryBudget
+from file_utils import group_by_folder
+from pagination import PastLastPage, page_number
+from bookkeeping import ThreadBook
+from dedupe import HashIndex, new_hasher
+from page_cache import open_page_cache
+from browser_pool import BrowserPool
+from rate_limit import AdaptiveRateLimiter
+from retry_utils import RetryPolicy
+
+
+class PageJob:
+    """Bookkeeping for one page whose images are in the pool."""
+
+    def __init__(self, index, url, image_count, pending, post_id=None):
+        self.index = index
+        self.url = url
+        self.image_count = image_count
+        self.pending = pending
+        self.post_id = post_id
+        self.completed = 0
+        self.downloaded = 0
+        self.failed = 0
+
+
+class HybridDownloadEngine:
+    """
+    Downloads every thread in the queue, each into its own folder.
+
+    Up to max_parallel_threads threads run at once, started in queue order
+    as slots free up. They share the HTTP session, rate limiter, retry
+    budget, browser and worker pool, and the pool serves their images
+    round-robin, so a long thread cannot starve the short ones beside it.
+    """
+
+    def __init__(self, config, urls, cookies, log, progress, queue_store=None):
+        self.config = config
+        self.queue_store = queue_store
+        self.log = log
+        self.progress = progress
+        self.output_directory = config["output_directory"]
+        os.makedirs(self.output_directory, exist_ok=True)
+
+        workers = int(config.get("download_workers", 8))
+        per_host = int(config.get("per_host_connections", 4))
+        memory_budget_mb = float(config.get("memory_budget_mb", 64))
+        self.dedupe_mode = dedupe_mode(config)
+
+        self.max_parallel_threads = max(1, int(config.get("max_parallel_threads", 3)))
+
+        # Session for pages 2+ and every image. The forum host serves both
+        # images and each running job's page fetches, so its pool is sized
+        # for per_host downloads plus one page per job.
+        self.session = create_session(cookies, pool_size=workers,
+                                      per_host=per_host + self.max_parallel_threads)
+
+        # Pacing adapts per host: pages and image CDNs get separate buckets
+        self.limiter = AdaptiveRateLimiter(
+            page_rate=config.get("page_rate", 1.0),
+            image_rate=config.get("image_rate", 8.0)
+        )
+        self.retry = RetryPolicy(
+            max_attempts=config.get("retry_attempts", 4),
+            base_delay=config.get("retry_base_delay", 1.0),
+            max_delay=config.get("retry_max_delay", 30.0),
+            budget=config.get("retry_budget", 200)
+        )
+
+        self.pool = DownloadPool(workers, per_host)
+        self.budget = MemoryBudget(memory_budget_mb * 1024 * 1024)
+        self.hash_index = HashIndex(self.output_directory) if self.dedupe_mode != "off" else None
+        self.page_cache = open_page_cache(config)
+
+        # Playwright's sync API is bound to the thread that started it, so
+        # every job's browser fetches run on this one thread
+        self.browser = BrowserPool(cookies)
+        self.browser_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="simpdl-browser")
+
+        # Run-wide image counts behind the progress bar, shared by every job
+        self.images_total = 0
+        self.images_completed = 0
+        self._progress_lock = threading.Lock()
+
+        groups = group_by_folder(urls)
+        self.jobs = [ThreadJob(self, name, thread_urls, labelled=len(groups) > 1)
+                     for name, thread_urls in groups]
+
+    @property
+    def folders(self):
+        return [job.combined_output_dir for job in self.jobs]
+
+    def run(self):
+        """Run every thread job to completion. Returns the number of images saved."""
+        waiting = deque(self.jobs)
+
+        def run_jobs():
+            while True:
+                try:
+                    job = waiting.popleft()
+                except IndexError:
+                    return
+                try:
+                    job.run()
+                except Exception as e:
+                    self.log(f"ERROR in thread {job.name}: {str(e)}")
+
+        runners = [
+            threading.Thread(target=run_jobs, name=f"simpdl-job-{i}", daemon=True)
+            for i in range(min(self.max_parallel_threads, len(self.jobs)))
+        ]
+        if len(self.jobs) > 1:
+            self.log(f"{len(self.jobs)} threads queued, downloading up to {len(runners)} at a time")
+        for runner in runners:
+            runner.start()
+        try:
+            for runner in runners:
+                runner.join()
+            self.pool.shutdown()
+            self._close_browser()
+        except BaseException:
+            # Interrupted: jobs and their stages run on daemon threads and
+            # may be blocked on a full queue, so leave them behind
+            self.pool.shutdown(wait=False)
+            self.browser_executor.shutdown(wait=False)
+            raise
+        finally:
+            if self.hash_index:
+                self.hash_index.close()
+            if self.page_cache:
+                self.page_cache.close()
+
+        if self.retry.retries:
+            self.log(f"↻ Retries used: {self.retry.retries}/{self.retry.budget}")
+        return sum(job.total_downloaded for job in self.jobs)
+
+    def report_images(self, status_text, queued=0, completed=0):
+        """
+        Add to the run-wide image counts and report progress across every
+        job, so the bar does not jump between pages and threads finishing
+        out of order. status_text describes the page that moved.
+        """
+        with self._progress_lock:
+            self.images_total += queued
+            self.images_completed += completed
+            percent = (self.images_completed / self.images_total) * 100 if self.images_total else 0
+            self.progress(percent, status_text)
+
+    def _close_browser(self):
+        try:
+            self.browser_executor.submit(self.browser.close).result()
+        except Exception as e:
+            self.log(f"Browser shutdown failed: {e}")
+        self.browser_executor.shutdown()
+
+
+class ThreadJob:
+    """
+    One thread's part of a run: its ThreadBook, and the page fetch ->
+    parse -> results pipeline feeding the engine's pool.
+    """
+
+    def __init__(self, engine, name, urls, labelled=False):
+        config = engine.config
+        self.engine = engine
+        self.name = name
+        # Page lines name their thread when several run side by side
+        self.tag = f"{name} · " if labelled else ""
+        self.log = engine.log
+        self.session = engine.session
+        self.limiter = engine.limiter
+        self.retry = engine.retry
+        self.pool = engine.pool
+        self.budget = engine.budget
+        self.combined_output_dir = os.path.join(engine.output_directory, name)
+        self.book = ThreadBook(config, self.combined_output_dir, urls, self.log, engine.queue_store,
+                               engine.hash_index, engine.page_cache, self.tag)
+        # The book's list, which grows as the pager learns the thread's length
+        self.urls = self.book.urls
+
+        # Stage queues. Fetched pages wait here for the parser...
+        lookahead = int(config.get("pipeline_page_lookahead", 2))
+        self.html_queue = queue.Queue(maxsize=max(1, lookahead))
+        # ...the parser may only have this many images queued or running...
+        workers = self.pool.workers
+        backlog = int(config.get("pipeline_image_backlog", workers * 4))
+        self.backlog = threading.BoundedSemaphore(max(workers, backlog))
+        # ...and results come back here to be counted on the job's thread.
+        self.results = queue.Queue()
+
+        self.total_pages = len(self.urls)
+        self.total_downloaded = 0
+
+    def run(self):
+        """Run every stage to completion on the calling thread."""
+        stages = [
+            threading.Thread(target=self._fetch_stage, name=f"simpdl-fetch-{self.name}", daemon=True),
+            threading.Thread(target=self._parse_stage, name=f"simpdl-parse-{self.name}", daemon=True),
+        ]
+        self.book.start()
+        for stage in stages:
+            stage.start()
+        try:
+            self._collect_results()
+            for stage in stages:
+                stage.join()
+        finally:
+            self.book.close()
+
+    # -- Stage 1: page fetch ------------------------------------------------
+
+    def _fetch_stage(self):
+        try:
+            for index, url in enumerate(self.urls, 1):
+                self.log(f"\n[{self.tag}Page {index}/{self.total_pages}] Processing: {url}")
+
+                if self.book.already_done(url):
+                    self.log("Already complete in journal, skipping")
+                    self.book.set_state(url, "done")
+                    continue
+
+                try:
+                    self.book.pager.check(url)
+                except PastLastPage as e:
+                    self.log(str(e))
+                    self.book.set_state(url, "done")
+                    continue
+
+                self.book.set_state(url, "running")
+
+                # Use browser ONLY for page 1 or pages without /page-X
+                is_first_page = page_number(url) == 1
+                try:
+                    if is_first_page:
+                        self.log("Using BROWSER method (bypasses page 1 protection)...")
+                        html_content = self._page_with_browser(url)
+                        unchanged = self.book.remember_page(url, html_content)
+                    else:
+                        self.log("Using REQUESTS method (fast)...")
+                        html_content, unchanged = self._page_with_requests(url)
+                except PastLastPage as e:
+                    self.log(str(e))
+                    self.book.set_state(url, "done")
+                    continue
+                except Exception as e:
+                    self.log(f"ERROR on page {index}: {str(e)}")
+                    self.book.page_failed(url)
+                    continue
+
+                if not html_content:
+                    self.log("Failed to fetch page content, added to retry list")
+                    self.book.page_failed(url)
+                    continue
+
+                if self.book.learn(html_content):
+                    self.total_pages = len(self.urls)
+
+                if self.book.skip_unchanged(url, unchanged):
+                    continue
+
+                # Blocks while the parser is lookahead pages behind
+                self.html_queue.put((index, url, html_content))
+        except Exception as e:
+            self.log(f"ERROR in page fetch stage: {str(e)}")
+        finally:
+            self.html_queue.put(None)
+
+    def _log_page_retry(self, attempt, delay, reason):
+        self.log(f"  ↻ Page fetch failed ({reason}), retry {attempt} in {delay:.1f}s")
+
+    def _page_with_browser(self, url):
+        """Use the shared browser for a single page (page 1 only)"""
+        browser = self.engine.browser
+        if browser.started:
+            self.log(f"🌐 Reusing browser for: {url}")
+        else:
+            self.log(f"🌐 Launching browser for: {url}")
+
+        def attempt():
+            self.limiter.wait(url, "page")
+            return self.engine.browser_executor.submit(browser.fetch, url).result()
+
+        # Browser errors (navigation timeouts, crashed tabs) are all worth a retry
+        return self.retry.call(attempt, on_retry=self._log_page_retry, retry_on=(Exception,))
+
+    def _page_with_requests(self, url):
+        """
+        Use requests for pages 2+. Returns (html, unchanged); a cached page
+        is only fetched again if the server says it changed.
+        """
+        cached = self.book.cached_page(url)
+
+        def attempt(target, follow, headers=None):
+            self.limiter.wait(target, "page")
+            response = self.session.get(target, headers=headers, timeout=30, allow_redirects=follow)
+            pause = self.limiter.feedback(target, response.status_code, "page", response.headers.get("Retry-After"))
+            if pause:
+                self.log(f"⏳ Server pushed back (HTTP {response.status_code}), slowing down for {pause:.1f}s")
+            return response
+
+        # Redirects are looked at before following: a page past the end of
+        # the thread bounces back to the last one, which we already have.
+        validators = cached.conditional_headers() if cached else None
+        response = self.retry.call(lambda: attempt(url, False, validators), on_retry=self._log_page_retry)
+        if response.status_code == 304 and cached:
+            self.log("Not modified since last fetch, using cached copy")
+            self.book.not_modified(url)
+            return cached.body, True
+        if response.is_redirect:
+            target = urljoin(url, response.headers["Location"])
+            self.book.pager.check_redirect(url, target)
+            response = self.retry.call(lambda: attempt(target, True), on_retry=self._log_page_retry)
+        if response.status_code == 200:
+            return response.text, self.book.remember_page(url, response.text, response.headers)
+        self.log(f"HTTP {response.status_code}")
+        return None, False
+
+    # -- Stage 2: parse -----------------------------------------------------
+
+    def _parse_stage(self):
+        try:
+            while True:
+                item = self.html_queue.get()
+                if item is None:
+                    break
+                index, url, html_content = item
+                try:
+                    self._queue_page(index, url, html_content)
+                except Exception as e:
+                    self.log(f"ERROR on page {index}: {str(e)}")
+                    self.book.page_failed(url)
+        finally:
+            self.results.put(("end", None))
+
+    def _queue_page(self, index, url, html_content):
+        image_urls, pending, post_id = self.book.plan_page(url, html_content)
+
+        # Pages are parsed one at a time in queue order, so names are
+        # reserved in post order however the downloads finish.
+        names = self.book.allocator.reserve(len(pending))
+        job = PageJob(index, url, len(image_urls), len(pending), post_id)
+        self.results.put(("page", job))
+
+        for img_url, filename in zip(pending, names):
+            # Blocks while the pool already holds a full backlog
+            self.backlog.acquire()
+            future = self.pool.submit(img_url, self._fetch_image, img_url, url, filename, group=self.name)
+            future.add_done_callback(lambda f, job=job: self.results.put(("image", job, f)))
+
+    # -- Stage 3: image download (runs on the pool's workers) -------------
+
+    def _fetch_image(self, img_url, page_url, filename):
+        """
+        Validate and save one image. Returns (filename, duplicate_of),
+        or None if the image was rejected.
+        """
+        img_headers = self.session.headers.copy()
+        img_headers['Referer'] = page_url
+
+        # Single request: rejected from its header, otherwise streamed to disk
+        filepath = os.path.join(self.combined_output_dir, filename)
+
+        def attempt():
+            # Fresh hasher per attempt so a retried stream hashes cleanly
+            hasher = new_hasher() if self.book.hash_index else None
+            self.limiter.wait(img_url, "image")
+            try:
+                written = save_valid_image(self.session, img_url, filepath, headers=img_headers,
+                                           budget=self.budget, hasher=hasher)
+            except requests.HTTPError as e:
+                self.limiter.feedback(img_url, e.response.status_code, "image",
+                                      e.response.headers.get("Retry-After"))
+                raise
+            self.limiter.feedback(img_url, 200, "image")
+            return written, hasher
+
+        try:
+            written, hasher = self.retry.call(attempt)
+        except Exception as e:
+            if self.book.image_failed(img_url, page_url, e):
+                return None
+            raise
+        return self.book.image_saved(img_url, page_url, filename, written,
+                                     hasher.hexdigest() if hasher else None)
+
+    # -- Stage 4: results (engine thread) -----------------------------------
+
+    def _collect_results(self):
+        # Counters are only touched here, so they need no locking
+        parsing = True
+        open_pages = 0
+        while parsing or open_pages:
+            message = self.results.get()
+            kind, job = message[0], message[1]
+            if kind == "end":
+                parsing = False
+            elif kind == "page":
+                self.log(f"{self.tag}Page {job.index}: found {job.image_count} images, {job.pending} to download")
+                if job.pending:
+                    open_pages += 1
+                    self.engine.report_images(self._page_status(job), queued=job.pending)
+                else:
+                    self._finish_page(job)
+            else:
+                self.backlog.release()
+                self._record_result(job, message[2])
+                if job.completed == job.pending:
+                    self._finish_page(job)
+                    open_pages -= 1
+
+    def _record_result(self, job, future):
+        job.completed += 1
+        try:
+            if self.book.report_image(future.result()):
+                job.downloaded += 1
+                self.total_downloaded += 1
+        except Exception as e:
+            job.failed += 1
+            self.log(f"  ✗ Error: {str(e)[:50]}")
+
+        self.engine.report_images(self._page_status(job), completed=1)
+
+    def _page_status(self, job):
+        return f"{self.tag}Page {job.index}/{self.total_pages}: {job.completed}/{job.pending} images"
+
+    def _finish_page(self, job):
+        self.book.finish_page(job.index, job.url, job.image_count, job.post_id, job.failed, job.downloaded)
+
+
+def run_hybrid_download(config_path, urls_file, log, progress, overrides=None, cookie_file=None):
+    """
+    Run the hybrid engine to completion on the calling thread.
+
+    log(message) and progress(percent, status_text) are called from several
+    threads. overrides and cookie_file are passed on to
+    load_download_job. Returns (images_downloaded, thread_folders).
+    """
+    config, urls, cookie_data, queue_store = load_download_job(
+        config_path, urls_file, overrides, cookie_file
+    )
+    try:
+        engine = HybridDownloadEngine(config, urls, load_cookies(cookie_data),
+                                      log, progress, queue_store)
+        log(f"Using {engine.pool.workers} download workers ({engine.pool.per_host} per host)")
+        total = engine.run()
+    finally:
+        queue_store.close()
+    return total, engine.folders
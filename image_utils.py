@@ -1,6 +1,11 @@
+import os
+import struct
 import requests
-from PIL import Image
-from io import BytesIO
+from contextlib import nullcontext
+
+MIN_IMAGE_SIZE = 256
+PROBE_LIMIT = 64 * 1024
+CHUNK_SIZE = 16 * 1024
 
 def get_image_src(driver, image_element):
     try:
@@ -8,15 +13,177 @@ def get_image_src(driver, image_element):
     except Exception:
         return driver.execute_script("return arguments[0].getAttribute('src');", image_element)
 
-def is_valid_image(image_url):
+def sniff_image_size(data):
+    """
+    Read (width, height) from the first bytes of a JPEG, PNG, GIF or WebP file.
+    Returns None if the format is unknown or more bytes are needed.
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        if len(data) >= 24 and data[12:16] == b'IHDR':
+            return struct.unpack('>II', data[16:24])
+        return None
+
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        if len(data) >= 10:
+            return struct.unpack('<HH', data[6:10])
+        return None
+
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        chunk = data[12:16]
+        if chunk == b'VP8 ' and len(data) >= 30 and data[23:26] == b'\x9d\x01\x2a':
+            width, height = struct.unpack('<HH', data[26:30])
+            return width & 0x3fff, height & 0x3fff
+        if chunk == b'VP8L' and len(data) >= 25 and data[20] == 0x2f:
+            bits = struct.unpack('<I', data[21:25])[0]
+            return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+        if chunk == b'VP8X' and len(data) >= 30:
+            width = int.from_bytes(data[24:27], 'little') + 1
+            height = int.from_bytes(data[27:30], 'little') + 1
+            return width, height
+        return None
+
+    if data[:2] == b'\xff\xd8':
+        i = 2
+        while i + 4 <= len(data):
+            if data[i] != 0xff:
+                return None
+            marker = data[i + 1]
+            if marker == 0xff:
+                # Fill byte before the real marker
+                i += 1
+                continue
+            if marker in (0xd8, 0x01) or 0xd0 <= marker <= 0xd7:
+                i += 2
+                continue
+            # SOF0-SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+            if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+                if i + 9 > len(data):
+                    return None
+                height, width = struct.unpack('>HH', data[i + 5:i + 9])
+                return width, height
+            length = struct.unpack('>H', data[i + 2:i + 4])[0]
+            i += 2 + length
+        return None
+
+    return None
+
+def _is_large_enough(size, min_size):
+    width, height = size
+    return width >= min_size and height >= min_size
+
+def save_valid_image(session, image_url, dest_path, headers=None, timeout=15,
+                     min_size=MIN_IMAGE_SIZE, budget=None, hasher=None):
+    """
+    Stream an image to dest_path in one request, dropping the connection as
+    soon as its header shows it is smaller than min_size.
+
+    Data is written in chunks to dest_path + ".part", which is fsynced and
+    renamed into place only once complete, so a crash never leaves a
+    truncated image behind. If budget is given, the probe buffer is reserved
+    from it for the duration of the download. If hasher (a hashlib object)
+    is given, it is fed every byte as it is written.
+
+    Returns the number of bytes written, or None if the image was rejected.
+    Raises requests.HTTPError for non-200 responses.
+    """
+    if image_url.startswith("data:") or not image_url.startswith("http"):
+        return None
+
+    reservation = budget.reserve(PROBE_LIMIT + CHUNK_SIZE) if budget else nullcontext()
+    with reservation:
+        return _stream_to_file(session, image_url, dest_path, headers, timeout, min_size, hasher)
+
+def _stream_to_file(session, image_url, dest_path, headers, timeout, min_size, hasher):
+    response = session.get(image_url, headers=headers, timeout=timeout, stream=True)
+    writer = ImageWriter(dest_path, min_size, hasher)
     try:
-        if image_url.startswith("data:") or not image_url.startswith("http"):
-            return False
-        response = requests.get(image_url, stream=True)
-        if response.status_code == 200:
-            image = Image.open(BytesIO(response.content))
-            width, height = image.size
-            return width >= 256 and height >= 256
-    except Exception as e:
-        print(f"Error validating image {image_url}: {e}")
-    return False
+        if response.status_code != 200:
+            raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+
+        chunks = response.iter_content(CHUNK_SIZE)
+        for chunk in chunks:
+            if writer.probe(chunk):
+                break
+        if writer.too_small():
+            return None
+
+        writer.open()
+        for chunk in chunks:
+            writer.write(chunk)
+        return writer.finish()
+    except BaseException:
+        writer.discard()
+        raise
+    finally:
+        response.close()
+
+class ImageWriter:
+    """
+    Writes one streamed image to dest_path, for both engines: feed the head
+    of the response to probe() until it returns True, give up if
+    too_small(), otherwise open(), write() the rest and finish().
+
+    Data goes to dest_path + ".part", which is fsynced and renamed into
+    place only once complete, so a crash never leaves a truncated image
+    behind. hasher, if given, is fed every byte written. Call discard() if
+    the download fails part way.
+    """
+
+    def __init__(self, dest_path, min_size=MIN_IMAGE_SIZE, hasher=None):
+        self.dest_path = dest_path
+        self.part_path = dest_path + ".part"
+        self.min_size = min_size
+        self.hasher = hasher
+        self.buffer = bytearray()
+        self.size = None
+        self.written = 0
+        self._file = None
+
+    def probe(self, chunk):
+        """Buffer a chunk of the head. True once there is enough to judge the image."""
+        self.buffer.extend(chunk)
+        self.size = sniff_image_size(self.buffer)
+        return self.size is not None or len(self.buffer) >= PROBE_LIMIT
+
+    def too_small(self):
+        return self.size is not None and not _is_large_enough(self.size, self.min_size)
+
+    def open(self):
+        """Create the .part file and write the probed head to it."""
+        self._file = open(self.part_path, "wb")
+        buffer, self.buffer = self.buffer, None
+        self.write(buffer)
+
+    def write(self, chunk):
+        self._file.write(chunk)
+        if self.hasher is not None:
+            self.hasher.update(chunk)
+        self.written += len(chunk)
+
+    def finish(self):
+        """
+        Sync and close the file, then move it into place. Returns the number
+        of bytes written, or None if the image turned out to be too small.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+        if self.size is None:
+            # Header not found in the probe window; let PIL read it from disk
+            from PIL import Image
+            with Image.open(self.part_path) as image:
+                self.size = image.size
+            if not _is_large_enough(self.size, self.min_size):
+                os.remove(self.part_path)
+                return None
+
+        os.replace(self.part_path, self.dest_path)
+        return self.written
+
+    def discard(self):
+        """Close and delete a partly written file."""
+        if self._file is not None:
+            self._file.close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
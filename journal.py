@@ -0,0 +1,176 @@
+"""
+Download Journal
+Per-folder SQLite record of which pages and images have already been saved,
+so an interrupted or repeated run can skip them without touching the network.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from pagination import page_number
+
+JOURNAL_FILENAME = ".simpdl_journal.db"
+
+# Image states that never need another request; "missing" is an image the
+# host answered 404 or 410 for
+FINISHED_STATES = ("done", "rejected", "duplicate", "missing")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    image_count INTEGER,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS images (
+    image_url TEXT PRIMARY KEY,
+    page_url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    bytes INTEGER,
+    filename TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS open_pages (
+    url TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS threads (
+    url TEXT PRIMARY KEY,
+    last_page INTEGER NOT NULL,
+    max_post_id INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class DownloadJournal:
+    """
+    Journal stored in the thread's output folder.
+
+    Safe to share between the engine thread and download workers; every write
+    is committed immediately so nothing is lost if the run is killed.
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, JOURNAL_FILENAME)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def page_done(self, page_url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM pages WHERE url = ?", (page_url,)
+            ).fetchone()
+        return row is not None and row[0] == "done"
+
+    def page_open(self, page_url):
+        """True if the page was its thread's last when saved, so it may have grown since."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM open_pages WHERE url = ?", (page_url,)
+            ).fetchone()
+        return row is not None
+
+    def mark_page(self, page_url, status, image_count=None, last=False):
+        """last: the thread had no later page yet, so new posts can still land on this one."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, status, image_count, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (page_url, status, image_count, time.time())
+            )
+            if last:
+                self._conn.execute("INSERT OR IGNORE INTO open_pages (url) VALUES (?)", (page_url,))
+            else:
+                self._conn.execute("DELETE FROM open_pages WHERE url = ?", (page_url,))
+
+    def image_statuses(self, image_urls):
+        """Return {image_url: status} for the urls the journal knows about."""
+        statuses = {}
+        image_urls = list(image_urls)
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(image_urls), 500):
+                batch = image_urls[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT image_url, status FROM images WHERE image_url IN ({placeholders})",
+                    batch
+                )
+                statuses.update(rows)
+        return statuses
+
+    def record_image(self, image_url, page_url, status, size=None, filename=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images "
+                "(image_url, page_url, status, bytes, filename, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (image_url, page_url, status, size, filename, time.time())
+            )
+
+    def thread_sync(self, thread_url):
+        """(last_page, max_post_id) reached by earlier runs, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_page, max_post_id FROM threads WHERE url = ?", (thread_url,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def advance_thread_sync(self, thread_url, page, post_id):
+        """Move the thread's sync point forward; it never moves back."""
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR IGNORE INTO threads (url, last_page, max_post_id, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (thread_url, page, post_id, now)
+            )
+            self._conn.execute(
+                "UPDATE threads SET last_page = MAX(last_page, ?), "
+                "max_post_id = MAX(max_post_id, ?), updated_at = ? WHERE url = ?",
+                (page, post_id, now, thread_url)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SyncFrontier:
+    """
+    Moves a thread's sync point as its pages finish during a run.
+
+    Pages finish out of order, so the point only advances to the highest
+    page saved in full whose earlier queued pages have all finished as
+    well. A page left failed or partial holds it back, and the next run
+    resumes early enough to fetch that page again. Pages after the sync
+    point are not all refetched: the journal skips the ones saved in full,
+    except the thread's last page (see DownloadJournal.page_open).
+    """
+
+    def __init__(self, journal, pager):
+        self.journal = journal
+        self.pager = pager
+        self._results = {}  # page number -> (saved in full, highest post ID)
+        self._lock = threading.Lock()
+
+    def settle(self, url, ok, post_id=None):
+        """Record how url ended; post_id is the highest post of a page saved in full."""
+        if not self.pager.owns(url):
+            return
+        with self._lock:
+            self._results[page_number(url)] = (ok, post_id)
+            reached = None
+            for number in sorted({page_number(u) for u in self.pager.urls if self.pager.owns(u)}):
+                ok, post_id = self._results.get(number, (False, None))
+                if not ok:
+                    break
+                if post_id:
+                    reached = (number, post_id)
+        if reached:
+            self.journal.advance_thread_sync(self.pager.base_url, *reached)
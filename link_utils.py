@@ -7,15 +7,13 @@ import ttkbootstrap as tb
 from ttkbootstrap.constants import *
 import tkinter as tk
 
+from pagination import page_url, thread_base_url
+from queue_store import open_queue
+
 def generate_links(base_link, num_pages):
     """Generate paginated links from base URL."""
-    links = []
-    for page_num in range(1, num_pages + 1):
-        if page_num == 1:
-            links.append(f"{base_link.rstrip('/')}/page-1")
-        else:
-            links.append(f"{base_link.rstrip('/')}/page-{page_num}")
-    return links
+    base_link = thread_base_url(base_link)
+    return [page_url(base_link, page_num) for page_num in range(1, num_pages + 1)]
 
 def build_generate_links_frame(parent, urls_file, refresh_urls_func=None):
     """Modern link generator interface."""
@@ -76,7 +74,7 @@ def build_generate_links_frame(parent, urls_file, refresh_urls_func=None):
 
     pages_label = tb.Label(
         pages_frame,
-        text="How many pages to generate?",
+        text="How many pages to generate? Later pages are found automatically while downloading.",
         font=("Helvetica", 10),
         bootstyle="secondary"
     )
@@ -85,7 +83,7 @@ def build_generate_links_frame(parent, urls_file, refresh_urls_func=None):
     pages_spinbox = tb.Spinbox(
         pages_frame,
         from_=1,
-        to=100,
+        to=10000,
         font=("Helvetica", 11),
         bootstyle="info"
     )
@@ -118,9 +116,11 @@ def build_generate_links_frame(parent, urls_file, refresh_urls_func=None):
 
             links = generate_links(base_link, num_pages)
 
-            with open(urls_file, "w") as f:
-                for link in links:
-                    f.write(link + "\n")
+            queue_store = open_queue(urls_file)
+            try:
+                queue_store.replace(links)
+            finally:
+                queue_store.close()
 
             status_label.config(
                 text=f"✓ Successfully generated {num_pages} URLs!",
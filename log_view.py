@@ -0,0 +1,172 @@
+"""
+Log View
+Bounded activity log for the Download Center.
+
+The Text widget only ever holds the last max_lines lines; the complete,
+uncollapsed history goes to a rotating file on disk. Lines are classified
+by the markers the engines already print (✓, ✗, ↻, ...) so the view can be
+filtered to summaries or errors, and runs of per-image "✓ Downloaded"
+lines can be collapsed into one summary every couple of seconds.
+"""
+
+import logging
+import os
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+DEFAULT_MAX_LINES = 2000
+# Records kept for re-rendering after a filter change, per widget line
+HISTORY_FACTOR = 10
+SUMMARY_INTERVAL_MS = 2000
+LOG_FILE_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+IMAGE_MARK = "✓ Downloaded:"
+ERROR_MARKS = ("✗", "❌", "⚠️", "ERROR", "HTTP ", "Traceback", "Failed ", "Browser shutdown failed")
+DETAIL_MARKS = ("↻", "↺", "⏳", "🌐", "Using ")
+
+# Levels shown by each filter; None shows everything
+FILTERS = {
+    "All": None,
+    "Summary only": ("summary", "error"),
+    "Errors only": ("error",),
+}
+
+FILE_LEVELS = {
+    "error": logging.ERROR,
+    "summary": logging.INFO,
+    "detail": logging.DEBUG,
+    "image": logging.DEBUG,
+}
+
+
+def classify(message):
+    """Level of a log line: "image", "error", "detail" or "summary"."""
+    text = message.strip()
+    if text.startswith(IMAGE_MARK):
+        return "image"
+    if text.startswith(ERROR_MARKS):
+        return "error"
+    if text.startswith(DETAIL_MARKS):
+        return "detail"
+    return "summary"
+
+
+def open_log_file(path):
+    """Logger writing to a rotating file at path, created once per path."""
+    logger = logging.getLogger(f"simpdl.activity.{path}")
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=LOG_FILE_BYTES,
+                                      backupCount=LOG_FILE_BACKUPS, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+    return logger
+
+
+def summarize_images(texts):
+    """One line standing in for a run of "✓ Downloaded: name" lines."""
+    if len(texts) == 1:
+        return texts[0]
+    first = texts[0].strip()[len(IMAGE_MARK):].strip()
+    last = texts[-1].strip()[len(IMAGE_MARK):].strip()
+    return f"  ✓ Downloaded {len(texts)} images ({first} … {last})"
+
+
+class LogView:
+    """
+    Drives a tk.Text as a ring buffer. Must be used from the Tk thread;
+    append() takes a batch of lines, as drained from the event bus.
+    """
+
+    def __init__(self, text_widget, max_lines=DEFAULT_MAX_LINES, log_path=None):
+        self.text = text_widget
+        self.max_lines = max(100, int(max_lines))
+        self.records = deque(maxlen=self.max_lines * HISTORY_FACTOR)
+        self.file_log = open_log_file(log_path) if log_path else None
+        self.filter = "All"
+        self.collapse = True
+        self._pending_images = []
+        self._flush_token = 0
+
+    def append(self, messages):
+        lines = []
+        for message in messages:
+            level = classify(message)
+            self.records.append((level, message))
+            if self.file_log:
+                self.file_log.log(FILE_LEVELS[level], message.strip("\n"))
+            lines.extend(self._render(level, message))
+        self._write(lines)
+
+    def _render(self, level, message, timed=True):
+        """
+        Lines to show for one record under the current filter and collapse
+        setting. With timed, a run of image lines is also flushed after
+        SUMMARY_INTERVAL_MS even if nothing else arrives.
+        """
+        shown = FILTERS[self.filter]
+        if level == "image" and self.collapse and shown is None:
+            if timed and not self._pending_images:
+                self._schedule_flush()
+            self._pending_images.append(message)
+            return []
+        lines = self._take_pending()
+        if shown is None or level in shown:
+            lines.append(message)
+        return lines
+
+    def _take_pending(self):
+        if not self._pending_images:
+            return []
+        line = summarize_images(self._pending_images)
+        self._pending_images = []
+        self._flush_token += 1
+        return [line]
+
+    def _schedule_flush(self):
+        token = self._flush_token
+
+        def flush():
+            # Skip if the run was already flushed by a later line
+            if token == self._flush_token:
+                self._write(self._take_pending())
+
+        self.text.after(SUMMARY_INTERVAL_MS, flush)
+
+    def _write(self, lines):
+        if not lines:
+            return
+        self.text.insert("end", "\n".join(lines) + "\n")
+        # Trim from the top so the widget never grows past max_lines
+        line_count = int(self.text.index("end-1c").split(".")[0])
+        if line_count > self.max_lines:
+            self.text.delete("1.0", f"{line_count - self.max_lines + 1}.0")
+        self.text.see("end")
+
+    def set_filter(self, name):
+        self.filter = name
+        self.refresh()
+
+    def set_collapse(self, collapse):
+        self.collapse = collapse
+        self.refresh()
+
+    def refresh(self):
+        """Redraw the widget from the kept records under the current settings."""
+        self.text.delete("1.0", "end")
+        self._pending_images = []
+        self._flush_token += 1
+        lines = []
+        for level, message in self.records:
+            lines.extend(self._render(level, message, timed=False))
+        lines.extend(self._take_pending())
+        self._write(lines[-self.max_lines:])
+
+    def clear(self):
+        self.records.clear()
+        self._pending_images = []
+        self._flush_token += 1
+        self.text.delete("1.0", "end")
@@ -1,12 +1,14 @@
 import os
-import webbrowser
 import tkinter as tk
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
 
-from config_utils import build_config_frame, build_urls_frame
-from downloader_hybrid import build_download_frame
-from link_utils import build_generate_links_frame
+REPO_URL = "https://github.com/annashumate1/SimpDL"
+
+def open_repo(event=None):
+    # webbrowser pulls in subprocess and friends; only load it when clicked
+    import webbrowser
+    webbrowser.open(REPO_URL)
 
 def main_gui():
     script_dir = os.path.dirname(os.path.realpath(__file__))
@@ -148,12 +150,22 @@ def main_gui():
     content_container.pack(fill="both", expand=True, padx=35, pady=30)
 
     pages = {}
+    # Every page but the Dashboard is built the first time it is shown
+    # and kept for later visits
+    page_builders = {}
     active_button = [None]
 
     def show_page(page_name, page_title, page_subtitle, button):
-        for page in pages.values():
-            page.pack_forget()
-        pages[page_name].pack(fill="both", expand=True)
+        page = pages.get(page_name)
+        if page is None:
+            page = pages[page_name] = page_builders[page_name]()
+        elif hasattr(page, "refresh_list"):
+            # Queue states move on while a download runs
+            page.refresh_list()
+        for other in pages.values():
+            if other is not page:
+                other.pack_forget()
+        page.pack(fill="both", expand=True)
         
         current_page_label.config(text=page_title)
         breadcrumb_sub.config(text=page_subtitle)
@@ -216,7 +228,7 @@ def main_gui():
 
     docs_btn_frame = tk.Frame(cta_frame, bg='#1e293b', relief='flat', bd=0, cursor='hand2')
     docs_btn_frame.pack(side="left")
-    docs_btn_frame.bind("<Button-1>", lambda e: webbrowser.open("https://github.com/annashumate1/SimpDL"))
+    docs_btn_frame.bind("<Button-1>", open_repo)
 
     docs_btn = tk.Label(
         docs_btn_frame,
@@ -227,7 +239,7 @@ def main_gui():
         cursor='hand2'
     )
     docs_btn.pack(padx=24, pady=12)
-    docs_btn.bind("<Button-1>", lambda e: webbrowser.open("https://github.com/annashumate1/SimpDL"))
+    docs_btn.bind("<Button-1>", open_repo)
 
     # Stats
     stats_row = tk.Frame(home_page, bg='#0a0e27', relief='flat', bd=0)
@@ -329,21 +341,34 @@ def main_gui():
 
     pages["home"] = home_page
 
-    # Build other pages
-    config_page = build_config_frame(content_container, config_path)
-    pages["config"] = config_page
+    # Builders for the other pages; their modules are imported on first use too
+    def build_config_page():
+        from config_utils import build_config_frame
+        return build_config_frame(content_container, config_path)
 
-    urls_page = build_urls_frame(content_container, urls_file)
-    pages["urls"] = urls_page
+    def build_urls_page():
+        from config_utils import build_urls_frame
+        return build_urls_frame(content_container, urls_file)
 
     def refresh_urls_list():
-        urls_page.refresh_list()
+        # Not built yet: it reads the queue when it is
+        if "urls" in pages:
+            pages["urls"].refresh_list()
+
+    def build_generate_page():
+        from link_utils import build_generate_links_frame
+        return build_generate_links_frame(content_container, urls_file, refresh_urls_list)
 
-    generate_page = build_generate_links_frame(content_container, urls_file, refresh_urls_list)
-    pages["generate"] = generate_page
+    def build_download_page():
+        from downloader_hybrid import build_download_frame
+        return build_download_frame(content_container, config_path, urls_file)
 
-    download_page = build_download_frame(content_container, config_path, urls_file)
-    pages["download"] = download_page
+    page_builders.update({
+        "config": build_config_page,
+        "urls": build_urls_page,
+        "generate": build_generate_page,
+        "download": build_download_page,
+    })
 
     # Navigation buttons
     nav_items = [
@@ -387,7 +412,7 @@ def main_gui():
         cursor='hand2'
     )
     github_link.pack(anchor="w", pady=(0, 15))
-    github_link.bind("<Button-1>", lambda e: webbrowser.open("https://github.com/annashumate1/SimpDL"))
+    github_link.bind("<Button-1>", open_repo)
 
     exit_frame = tk.Frame(footer_frame, bg='#7f1d1d', relief='flat', bd=0, cursor='hand2')
     exit_frame.pack(fill="x")
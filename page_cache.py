@@ -0,0 +1,182 @@
+"""
+Page Cache
+On-disk cache of thread page HTML, kept in the output directory and keyed
+by canonical URL.
+
+Each entry keeps the page's ETag and Last-Modified, so a refetch can ask the
+forum for the page only if it changed (If-None-Match / If-Modified-Since),
+and a hash of its content, so a page served in full can still be recognised
+as unchanged. Entries expire after a TTL, and the least recently used ones
+are evicted once the cache outgrows its size cap.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit
+
+from dedupe import new_hasher
+from pagination import PAGE_SUFFIX
+
+CACHE_FILENAME = ".simpdl_pages.db"
+DEFAULT_MAX_MB = 64
+DEFAULT_TTL_HOURS = 24 * 7
+
+# Per-request tokens XenForo writes into every page, left out of the hash so
+# an unchanged page hashes the same on every fetch
+VOLATILE = re.compile(rb'(data-csrf="[^"]*"|name="_xfToken" value="[^"]*"|"csrf": ?"[^"]*")')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body_hash TEXT NOT NULL,
+    body BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    validated_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_used ON pages (used_at);
+"""
+
+
+def canonical_url(url):
+    """
+    Cache key for a page URL: lowercase scheme and host, no fragment or
+    trailing slash, and page 1 under the bare thread URL.
+    """
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/")
+    match = PAGE_SUFFIX.search(path)
+    if match and match.group(1) == "1":
+        path = path[:match.start()]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+def content_hash(html):
+    data = html.encode("utf-8", errors="replace") if isinstance(html, str) else html
+    hasher = new_hasher()
+    hasher.update(VOLATILE.sub(b"", data))
+    return hasher.hexdigest()
+
+
+class CachedPage:
+    """A page as last fetched, with the validators it was served with."""
+
+    def __init__(self, url, etag, last_modified, body_hash, body):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body_hash = body_hash
+        self.body = body
+
+    def conditional_headers(self):
+        """Headers asking the server to answer 304 if the page is unchanged."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """
+    Canonical URL -> page HTML, kept in output_directory/.simpdl_pages.db.
+
+    Bodies are stored compressed; max_mb caps their total size. Safe to
+    share between threads.
+    """
+
+    def __init__(self, output_directory, max_mb=DEFAULT_MAX_MB, ttl_hours=DEFAULT_TTL_HOURS):
+        self.path = os.path.join(output_directory, CACHE_FILENAME)
+        self.max_bytes = max(0, float(max_mb)) * 1024 * 1024
+        self.ttl = max(0, float(ttl_hours)) * 3600
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE validated_at < ?", (time.time() - self.ttl,))
+
+    def lookup(self, url):
+        """The cached copy of url, or None if there is none or it has expired."""
+        key = canonical_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body_hash, body, validated_at FROM pages WHERE url = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[4] < now - self.ttl:
+                self._conn.execute("DELETE FROM pages WHERE url = ?", (key,))
+                return None
+            self._conn.execute("UPDATE pages SET used_at = ? WHERE url = ?", (now, key))
+        body = zlib.decompress(row[3]).decode("utf-8", errors="replace")
+        return CachedPage(key, row[0], row[1], row[2], body)
+
+    def refresh(self, url):
+        """The server confirmed the cached copy (304): restart its TTL."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET validated_at = ?, used_at = ? WHERE url = ?",
+                (now, now, canonical_url(url))
+            )
+
+    def store(self, url, html, etag=None, last_modified=None):
+        """
+        Cache a freshly fetched page. Returns True if its content matches
+        the copy it replaces, i.e. the page has not changed.
+        """
+        key = canonical_url(url)
+        body_hash = content_hash(html)
+        body = zlib.compress(html.encode("utf-8", errors="replace"))
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body_hash, validated_at FROM pages WHERE url = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, etag, last_modified, body_hash, body, bytes, validated_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, body_hash, body, len(body), now, now)
+            )
+            self._evict()
+        return row is not None and row[1] >= now - self.ttl and row[0] == body_hash
+
+    def _evict(self):
+        """Drop least recently used pages until the cache fits max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for url, size in self._conn.execute("SELECT url, bytes FROM pages ORDER BY used_at"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((url,))
+            total -= size
+        self._conn.executemany("DELETE FROM pages WHERE url = ?", doomed)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_page_cache(config):
+    """The page cache for config's output directory, or None if turned off."""
+    if not config.get("page_cache", True):
+        return None
+    return PageCache(
+        config["output_directory"],
+        max_mb=config.get("page_cache_mb", DEFAULT_MAX_MB),
+        ttl_hours=config.get("page_cache_ttl_hours", DEFAULT_TTL_HOURS)
+    )
@@ -0,0 +1,123 @@
+"""
+Pagination
+Thread page URLs, and where a thread ends.
+
+XenForo lists a thread's pages in its pageNav, and answers a request for a
+page past the end with a redirect back to the last one. ThreadPager uses
+both so an engine fetches exactly the pages that exist.
+"""
+
+import re
+from urllib.parse import urlsplit
+
+PAGE_SUFFIX = re.compile(r"/page-(\d+)$")
+# <li class="pageNav-page ..."><a href=".../page-37">37</a></li>
+PAGE_NAV_LINK = re.compile(
+    r'<li[^>]*class="[^"]*\bpageNav-page\b[^"]*"[^>]*>\s*<a[^>]*>\s*(\d+)\s*</a>'
+)
+# Older themes put the count on the container: <div class="PageNav" data-last="37">
+PAGE_NAV_LAST = re.compile(r'class="[^"]*\bPageNav\b[^"]*"[^>]*data-last="(\d+)"')
+
+
+class PastLastPage(Exception):
+    """A queued page lies beyond the end of its thread."""
+
+
+def thread_base_url(url):
+    """The thread URL without query, fragment, trailing slash or /page-N."""
+    url = url.split('#')[0].split('?')[0].rstrip('/')
+    return PAGE_SUFFIX.sub("", url)
+
+
+def page_number(url):
+    """Page number of a thread URL; a URL without /page-N is page 1."""
+    match = PAGE_SUFFIX.search(urlsplit(url).path.rstrip('/'))
+    return int(match.group(1)) if match else 1
+
+
+def page_url(base_url, number):
+    return f"{base_url.rstrip('/')}/page-{number}"
+
+
+def find_last_page(html):
+    """Last page number advertised by a thread page's pageNav, or None."""
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    numbers = [int(n) for n in PAGE_NAV_LINK.findall(html)]
+    numbers += [int(n) for n in PAGE_NAV_LAST.findall(html)]
+    return max(numbers) if numbers else None
+
+
+class ThreadPager:
+    """
+    Keeps a download queue in step with the length of its thread (the
+    thread of the first queued URL).
+
+    The first fetched page's pageNav gives the last page: the queue is
+    extended up to it, and queued pages past it are skipped. A page that
+    redirects to an earlier page marks the end as well.
+
+    For incremental sync, resume() names the page an earlier run stopped
+    on: it is fetched again even if the journal has it, since new posts
+    land there, and the queue grows from it.
+    """
+
+    def __init__(self, urls):
+        self.urls = urls
+        self.base_url = thread_base_url(urls[0])
+        self.last_page = None
+        self.resume_page = None
+        self._learned = False
+
+    def owns(self, url):
+        return thread_base_url(url) == self.base_url
+
+    def resume(self, page):
+        """Queue page in order, if it is not already, and mark it for refetching."""
+        self.resume_page = page
+        owned = [i for i, u in enumerate(self.urls) if self.owns(u)]
+        if any(page_number(self.urls[i]) == page for i in owned):
+            return
+        later = [i for i in owned if page_number(self.urls[i]) > page]
+        self.urls.insert(later[0] if later else len(self.urls), page_url(self.base_url, page))
+
+    def is_resume_page(self, url):
+        return self.resume_page is not None and self.owns(url) and page_number(url) == self.resume_page
+
+    def check(self, url):
+        """Raise PastLastPage if url is known to lie beyond the thread's end."""
+        if self.last_page is not None and self.owns(url) and page_number(url) > self.last_page:
+            raise PastLastPage(f"Thread ends at page {self.last_page}, skipping")
+
+    def learn(self, html):
+        """
+        Read the page count from the first fetched page and append the
+        missing pages to the queue. Returns how many URLs were added.
+        """
+        if self._learned:
+            return 0
+        self._learned = True
+        last_page = find_last_page(html)
+        if last_page is None:
+            return 0
+        self.last_page = last_page
+
+        # Continue after the furthest queued page that actually exists
+        queued = [page_number(u) for u in self.urls if self.owns(u)]
+        start = max((n for n in queued if n <= last_page), default=0) + 1
+        added = [page_url(self.base_url, n) for n in range(start, last_page + 1)]
+        self.urls.extend(added)
+        return len(added)
+
+    def check_redirect(self, url, target):
+        """
+        Called when url answered with a redirect to target. Raises
+        PastLastPage if it was bounced to an earlier page of the thread,
+        which is how XenForo answers for pages that do not exist.
+        """
+        if not self.owns(url) or thread_base_url(target) != self.base_url:
+            return
+        requested, landed = page_number(url), page_number(target)
+        if landed < requested:
+            self.last_page = landed if self.last_page is None else min(self.last_page, landed)
+            raise PastLastPage(f"Page {requested} redirects to page {landed}: thread ends there, stopping")
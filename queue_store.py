@@ -0,0 +1,237 @@
+"""
+Queue Store
+SQLite-backed download queue: one row per URL with its thread, state,
+attempt count and timestamps.
+
+Adding, removing or updating a URL touches only its own row, so the queue
+never has to be rewritten as a whole, and every change is committed as it
+happens: a run killed halfway leaves the queue exactly as far as it got.
+The plain one-URL-per-line urls.txt format is kept for import and export.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from pagination import thread_base_url
+
+STATES = ("pending", "running", "done", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    thread TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    added_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS queue_thread ON queue (thread, id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS text_lines (
+    path TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (path, url)
+);
+"""
+
+
+def queue_path(urls_file):
+    """The store kept next to a urls.txt: config/urls.txt -> config/urls.db."""
+    return os.path.splitext(urls_file)[0] + ".db"
+
+
+def read_url_lines(path):
+    with open(path, "r") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _mtime_key(path):
+    return "text_mtime:" + os.path.abspath(path)
+
+
+def _text_key(path):
+    return os.path.abspath(path)
+
+
+class QueueStore:
+    """
+    The queue, in queue order. Safe to share between threads; open one
+    store per process and component if that is simpler, SQLite's WAL mode
+    lets them read and write the same file side by side.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def entries(self):
+        """[(id, url, state)] for the whole queue."""
+        with self._lock:
+            return self._conn.execute("SELECT id, url, state FROM queue ORDER BY id").fetchall()
+
+    def urls(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT url FROM queue ORDER BY id")]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM queue").fetchone()[0]
+
+    def counts(self):
+        """{state: number of URLs}"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT state, COUNT(*) FROM queue GROUP BY state"))
+
+    def append(self, urls):
+        """
+        Add urls to the end of the queue in one transaction, leaving out
+        any already queued. Returns [(id, url)] for the rows added.
+        """
+        with self._lock:
+            return self._transaction(self._insert, urls)
+
+    def remove(self, ids):
+        rows = [(i,) for i in ids]
+        with self._lock:
+            self._transaction(self._conn.executemany, "DELETE FROM queue WHERE id = ?", rows)
+
+    def replace(self, urls):
+        """Make urls the whole queue, atomically. Returns [(id, url)]."""
+        def swap():
+            self._conn.execute("DELETE FROM queue")
+            return self._insert(urls)
+
+        with self._lock:
+            return self._transaction(swap)
+
+    def _transaction(self, work, *args):
+        self._conn.execute("BEGIN")
+        try:
+            result = work(*args)
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        return result
+
+    def _insert(self, urls):
+        added = []
+        now = time.time()
+        for url in urls:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO queue (url, thread, added_at, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (url, thread_base_url(url), now, now)
+            )
+            if cursor.rowcount:
+                added.append((cursor.lastrowid, url))
+        return added
+
+    def set_state(self, url, state):
+        """Record a URL's new state; moving to "running" counts an attempt."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE queue SET state = ?, attempts = attempts + ?, updated_at = ? WHERE url = ?",
+                (state, 1 if state == "running" else 0, time.time(), url)
+            )
+
+    def recover(self):
+        """
+        Put URLs left "running" by a run that never finished back to
+        "pending". Call only when no run is active. Returns how many.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE queue SET state = 'pending', updated_at = ? WHERE state = 'running'",
+                (time.time(),)
+            )
+        return cursor.rowcount
+
+    def import_text(self, path):
+        """Append the URLs of a one-per-line file. Returns [(id, url)] added."""
+        lines = read_url_lines(path)
+        added = self.append(lines)
+        self._remember_text(path, lines)
+        return added
+
+    def sync_text(self, path):
+        """
+        Import the lines added to path since it was last read, so URLs
+        added to urls.txt by hand or by a script still reach the queue.
+        Lines that were already there stay out of it if they have been
+        removed from the queue since.
+        """
+        if not os.path.exists(path):
+            return []
+        last = self._get_meta(_mtime_key(path))
+        if last is not None and os.path.getmtime(path) <= float(last):
+            return []
+        lines = read_url_lines(path)
+        with self._lock:
+            seen = {row[0] for row in self._conn.execute(
+                "SELECT url FROM text_lines WHERE path = ?", (_text_key(path),)
+            )}
+        added = self.append([url for url in lines if url not in seen])
+        self._remember_text(path, lines)
+        return added
+
+    def export_text(self, path):
+        """Write the queue to path, one URL per line, replacing it atomically."""
+        urls = self.urls()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for url in urls:
+                f.write(url + "\n")
+        os.replace(tmp_path, path)
+        # The file now matches the queue, so there is nothing to re-import
+        self._remember_text(path, urls)
+
+    def _remember_text(self, path, lines):
+        """Note the lines path holds now, so the next sync only takes new ones."""
+        key = _text_key(path)
+
+        def record():
+            self._conn.execute("DELETE FROM text_lines WHERE path = ?", (key,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO text_lines (path, url) VALUES (?, ?)",
+                [(key, url) for url in lines]
+            )
+
+        with self._lock:
+            self._transaction(record)
+        self._set_meta(_mtime_key(path), os.path.getmtime(path))
+
+    def _get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value))
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_queue(urls_file):
+    """
+    The store behind urls_file. URLs written to urls_file since the last
+    import (including every URL, the first time) are appended to it.
+    """
+    store = QueueStore(queue_path(urls_file))
+    store.sync_text(urls_file)
+    return store
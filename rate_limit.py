@@ -0,0 +1,146 @@
+"""
+Rate Limiting
+Per-host token buckets that slow down when a server pushes back and speed
+up again while its responses stay clean.
+"""
+
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# Responses that mean "you are going too fast"
+THROTTLE_STATUSES = (403, 429, 503)
+
+
+def parse_retry_after(value):
+    """Turn a Retry-After header (seconds or HTTP date) into seconds, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Classic token bucket. acquire() reserves a token and sleeps until it is
+    due, so concurrent callers are spaced out instead of stampeding.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def reserve(self):
+        """Take a token and return how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(delay, self._paused_until - now)
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    def pause(self, seconds):
+        """Hold every caller for at least seconds and drop any saved burst."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0.0)
+            self._paused_until = max(self._paused_until, now + seconds)
+
+
+class AdaptiveRateLimiter:
+    """
+    One TokenBucket per (kind, host), where kind separates forum pages from
+    image CDNs.
+
+    Throttling responses halve the host's rate and pause it for Retry-After
+    (or one request interval); every recover_after clean responses raise it
+    by a quarter, up to max_factor times the starting rate.
+    """
+
+    def __init__(self, page_rate=1.0, image_rate=8.0, recover_after=10,
+                 max_factor=4.0, min_rate=0.05):
+        self.base_rates = {"page": float(page_rate), "image": float(image_rate)}
+        self.recover_after = recover_after
+        self.max_factor = max_factor
+        self.min_rate = min_rate
+        self._buckets = {}
+        self._clean = {}
+        self._lock = threading.Lock()
+
+    def _key(self, url, kind):
+        return kind, urlparse(url).netloc.lower()
+
+    def _bucket(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate = self.base_rates[key[0]]
+                bucket = TokenBucket(rate, burst=max(1.0, rate))
+                self._buckets[key] = bucket
+                self._clean[key] = 0
+        return bucket
+
+    def wait(self, url, kind="page"):
+        """Block until the host is ready for another request of this kind."""
+        self._bucket(self._key(url, kind)).acquire()
+
+    async def wait_async(self, url, kind="page"):
+        """wait() for coroutines: yields to the event loop instead of blocking."""
+        delay = self._bucket(self._key(url, kind)).reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def feedback(self, url, status, kind="page", retry_after=None):
+        """
+        Report a response. Returns the back-off pause in seconds, or 0 if the
+        response was clean.
+        """
+        key = self._key(url, kind)
+        bucket = self._bucket(key)
+
+        if status in THROTTLE_STATUSES:
+            with self._lock:
+                self._clean[key] = 0
+            bucket.set_rate(max(self.min_rate, bucket.rate / 2))
+            pause = parse_retry_after(retry_after)
+            if pause is None:
+                pause = 1.0 / bucket.rate
+            bucket.pause(pause)
+            return pause
+
+        if status < 400:
+            with self._lock:
+                self._clean[key] += 1
+                speed_up = self._clean[key] >= self.recover_after
+                if speed_up:
+                    self._clean[key] = 0
+            if speed_up:
+                ceiling = self.base_rates[kind] * self.max_factor
+                bucket.set_rate(min(ceiling, bucket.rate * 1.25))
+        return 0.0
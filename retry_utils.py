@@ -0,0 +1,169 @@
+"""
+Retry Utilities
+Shared retry policy for page and image fetches, and the list of URLs that
+still failed once it gave up.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+import requests
+
+# Transport errors worth another attempt (timeouts, resets, truncated bodies)
+RETRYABLE_EXCEPTIONS = (
+    requests.Timeout,
+    requests.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+RETRY_LATER_FILENAME = "retry_later.txt"
+
+# The resource is gone for good: asking again will not bring it back
+GONE_STATUSES = (404, 410)
+
+
+def is_retryable_status(status):
+    return status == 429 or 500 <= status < 600
+
+
+def http_status(exc):
+    """HTTP status carried by a requests or aiohttp error, else None."""
+    response = getattr(exc, "response", None)
+    if response is not None and hasattr(response, "status_code"):
+        return response.status_code
+    status = getattr(exc, "status", None)
+    return status if isinstance(status, int) else None
+
+
+def is_gone(exc):
+    return http_status(exc) in GONE_STATUSES
+
+
+class RetryPolicy:
+    """
+    Capped exponential backoff with full jitter.
+
+    The budget is the total number of retries allowed for a whole job and is
+    shared by every thread using the policy; once it is spent, failures are
+    raised immediately.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0, budget=200):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.budget = int(budget)
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt):
+        """Delay before retry number attempt (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _take_budget(self):
+        with self._lock:
+            if self.retries >= self.budget:
+                return False
+            self.retries += 1
+            return True
+
+    def _retry_reason(self, exc, retry_on):
+        """Why exc is worth retrying, or None if it is not."""
+        status = http_status(exc)
+        if status is not None:
+            return f"HTTP {status}" if is_retryable_status(status) else None
+        if isinstance(exc, RETRYABLE_EXCEPTIONS + tuple(retry_on)):
+            return type(exc).__name__
+        return None
+
+    def call(self, fn, on_retry=None, retry_on=()):
+        """
+        Run fn() until it succeeds or stops being retryable.
+
+        fn may raise, or return a response whose status_code is checked; the
+        last response is returned as is when attempts run out. retry_on adds
+        exception types to retry beyond the transport errors above.
+        on_retry(attempt, delay, reason) is called before each sleep.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            last = attempt == self.max_attempts
+            try:
+                result = fn()
+            except Exception as e:
+                reason = self._retry_reason(e, retry_on)
+                if reason is None or last or not self._take_budget():
+                    raise
+            else:
+                status = getattr(result, "status_code", None)
+                if status is None or not is_retryable_status(status):
+                    return result
+                if last or not self._take_budget():
+                    return result
+                reason = f"HTTP {status}"
+
+            delay = self.backoff(attempt)
+            if on_retry:
+                on_retry(attempt, delay, reason)
+            time.sleep(delay)
+
+    async def call_async(self, fn, on_retry=None, retry_on=()):
+        """
+        call() for coroutines. fn() must return an awaitable, and signal a
+        failed response by raising rather than returning it.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return await fn()
+            except Exception as e:
+                reason = self._retry_reason(e, retry_on)
+                if reason is None or attempt == self.max_attempts or not self._take_budget():
+                    raise
+
+            delay = self.backoff(attempt)
+            if on_retry:
+                on_retry(attempt, delay, reason)
+            await asyncio.sleep(delay)
+
+
+class RetryLaterList:
+    """
+    URLs that failed permanently, kept in order without repeats and saved as
+    retry_later.txt in the thread folder. The file uses the same
+    one-URL-per-line format as urls.txt so it can be queued again as is.
+
+    URLs left by earlier runs are loaded and kept until a run finishes them.
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, RETRY_LATER_FILENAME)
+        self._urls = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self._urls = dict.fromkeys(line.strip() for line in f if line.strip())
+
+    def add(self, url):
+        with self._lock:
+            self._urls[url] = None
+
+    def discard(self, url):
+        """url has now been fetched in full."""
+        with self._lock:
+            self._urls.pop(url, None)
+
+    def __len__(self):
+        return len(self._urls)
+
+    def save(self):
+        """Write the list, or remove the file once nothing is left in it."""
+        with self._lock:
+            urls = list(self._urls)
+        if urls:
+            with open(self.path, "w") as f:
+                for url in urls:
+                    f.write(url + "\n")
+        elif os.path.exists(self.path):
+            os.remove(self.path)
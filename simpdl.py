@@ -0,0 +1,171 @@
+"""
+SimpDL Command Line
+Runs a download job without the GUI, for headless boxes and cron:
+
+    python -m simpdl download [--urls config/urls.txt] [--workers 16]
+    python -m simpdl queue {status,import FILE,export FILE}
+
+Nothing here imports Tk. Progress is written to stdout as JSON lines, one
+object per event, each with an "event" key: start, log, progress, done or
+error. The exit status tells a scheduler how the run went (see EXIT_*).
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from engine_config import ConfigError
+from queue_store import open_queue, queue_path, STATES
+from retry_utils import RETRY_LATER_FILENAME
+
+EXIT_OK = 0
+EXIT_FAILED = 1        # the run crashed
+EXIT_USAGE = 2         # bad arguments or configuration (argparse uses 2 too)
+EXIT_INCOMPLETE = 3    # finished, but some pages are in retry_later.txt
+EXIT_INTERRUPTED = 130
+
+
+class JsonLinesReporter:
+    """Writes events as JSON lines. Safe to call from the engine's threads."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        record = {"event": event, "time": round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def log(self, message):
+        message = message.strip()
+        # Separator lines of "=" only mean something in the GUI
+        if message.strip("="):
+            self.emit("log", message=message)
+
+    def progress(self, percent, status_text):
+        self.emit("progress", percent=round(percent, 1), status=status_text)
+
+
+def count_retry_later(folder):
+    path = os.path.join(folder, RETRY_LATER_FILENAME)
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def download(args, reporter):
+    overrides = {}
+    if args.output:
+        overrides["output_directory"] = args.output
+    if args.workers is not None:
+        overrides["download_workers"] = args.workers
+    if args.per_host is not None:
+        overrides["per_host_connections"] = args.per_host
+    if args.no_sync:
+        overrides["incremental_sync"] = False
+
+    engine = args.engine
+    if engine is None:
+        try:
+            with open(args.config, "r") as f:
+                engine = json.load(f).get("engine", "hybrid")
+        except (FileNotFoundError, json.JSONDecodeError):
+            engine = "hybrid"
+
+    if engine == "async":
+        from downloader_async import run_async_download as run_engine
+    else:
+        from hybrid_engine import run_hybrid_download as run_engine
+
+    reporter.emit("start", engine=engine, urls=os.path.abspath(args.urls))
+    try:
+        total, folders = run_engine(args.config, args.urls, reporter.log, reporter.progress,
+                                    overrides=overrides, cookie_file=args.cookies)
+    except ConfigError as e:
+        reporter.emit("error", message=str(e))
+        return EXIT_USAGE
+
+    retry_later = sum(count_retry_later(folder) for folder in folders)
+    reporter.emit("done", downloaded=total, folders=folders, retry_later=retry_later)
+    return EXIT_INCOMPLETE if retry_later else EXIT_OK
+
+
+def manage_queue(args, reporter):
+    # Importing may start a new queue; anything else needs an existing one
+    exists = os.path.exists(args.urls) or os.path.exists(queue_path(args.urls))
+    if args.action != "import" and not exists:
+        reporter.emit("error", message=f"URL list not found: {args.urls}")
+        return EXIT_USAGE
+    queue_store = open_queue(args.urls)
+    try:
+        if args.action == "import":
+            if not os.path.exists(args.file):
+                reporter.emit("error", message=f"File not found: {args.file}")
+                return EXIT_USAGE
+            added = queue_store.import_text(args.file)
+            reporter.emit("queue", added=len(added), total=len(queue_store))
+        elif args.action == "export":
+            queue_store.export_text(args.file)
+            reporter.emit("queue", exported=len(queue_store), file=os.path.abspath(args.file))
+        else:
+            counts = queue_store.counts()
+            reporter.emit("queue", total=len(queue_store),
+                          **{state: counts.get(state, 0) for state in STATES})
+    finally:
+        queue_store.close()
+    return EXIT_OK
+
+
+def main(argv=None):
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    config_dir = os.path.join(script_dir, "config")
+
+    parser = argparse.ArgumentParser(prog="simpdl", description="SimpDL headless downloader.")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    dl = commands.add_parser("download", help="download every URL in the queue")
+    dl.add_argument("--urls", default=os.path.join(config_dir, "urls.txt"),
+                    help="queue file, one URL per line (default: config/urls.txt)")
+    dl.add_argument("--config", default=os.path.join(config_dir, "config.json"),
+                    help="settings file (default: config/config.json)")
+    dl.add_argument("--cookies", default=None,
+                    help="cookie file (default: config/manual_cookies.json)")
+    dl.add_argument("--output", help="download folder, overriding output_directory")
+    dl.add_argument("--workers", type=int, help="parallel image downloads")
+    dl.add_argument("--per-host", type=int, help="parallel downloads per host")
+    dl.add_argument("--engine", choices=("hybrid", "async"), help="download backend")
+    dl.add_argument("--no-sync", action="store_true", help="ignore incremental sync state")
+
+    qu = commands.add_parser("queue", help="inspect the queue or move it to and from text files")
+    qu.add_argument("action", choices=("status", "import", "export"))
+    qu.add_argument("file", nargs="?", help="one-URL-per-line file to import or export")
+    qu.add_argument("--urls", default=os.path.join(config_dir, "urls.txt"),
+                    help="queue file, one URL per line (default: config/urls.txt)")
+    args = parser.parse_args(argv)
+    if args.command == "queue" and args.action != "status" and not args.file:
+        parser.error(f"queue {args.action} needs a FILE")
+
+    reporter = JsonLinesReporter()
+    try:
+        if args.command == "queue":
+            return manage_queue(args, reporter)
+        return download(args, reporter)
+    except KeyboardInterrupt:
+        reporter.emit("error", message="interrupted")
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        reporter.emit("error", message=str(e), type=type(e).__name__)
+        return EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
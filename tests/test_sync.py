@@ -0,0 +1,84 @@
+"""Incremental sync: which pages a rerun skips and which it fetches again."""
+
+from bookkeeping import ThreadBook
+from journal import DownloadJournal
+from pagination import page_number, page_url
+
+THREAD = "https://simpcity.cr/threads/x.1"
+POSTS_PER_PAGE = 2
+
+
+def url(number):
+    return THREAD if number == 1 else page_url(THREAD, number)
+
+
+def page_html(number, last_page, posts=POSTS_PER_PAGE):
+    first = (number - 1) * POSTS_PER_PAGE + 1
+    html = "".join(
+        f'<article data-content="post-{post}"><div class="message-body"><div class="bbWrapper">'
+        f'<img src="https://i.example/{post}.jpg"></div></div></article>'
+        for post in range(first, first + posts)
+    )
+    return html + "".join(f'<li class="pageNav-page"><a href="#">{n}</a></li>' for n in range(1, last_page + 1))
+
+
+def open_book(tmp_path):
+    return ThreadBook({"output_directory": str(tmp_path)}, str(tmp_path / "x.1"), [THREAD],
+                      log=lambda message: None)
+
+
+def run(tmp_path, pages, failed=()):
+    """
+    One run as the engines drive ThreadBook: pages maps page number to
+    HTML, and pages in failed lose one image. Returns the page numbers
+    the run fetched.
+    """
+    book = open_book(tmp_path)
+    fetched = []
+    try:
+        for index, page in enumerate(book.urls, 1):
+            number = page_number(page)
+            if number not in pages:
+                continue
+            if book.already_done(page):
+                book.set_state(page, "done")
+                continue
+            fetched.append(number)
+            html = pages[number]
+            book.learn(html)
+            image_urls, pending, post_id = book.plan_page(page, html)
+            lost = 1 if number in failed else 0
+            book.finish_page(index, page, len(image_urls), post_id, lost, len(pending) - lost)
+    finally:
+        book.close()
+    return fetched
+
+
+def test_partial_page_holds_the_sync_point(tmp_path):
+    run(tmp_path, {n: page_html(n, 3) for n in (1, 2, 3)}, failed=(2,))
+
+    journal = DownloadJournal(str(tmp_path / "x.1"))
+    try:
+        assert journal.thread_sync(THREAD) == (1, 2)
+    finally:
+        journal.close()
+
+
+def test_last_page_is_refetched_behind_a_partial_page(tmp_path):
+    run(tmp_path, {n: page_html(n, 3) for n in (1, 2, 3)}, failed=(2,))
+
+    # Page 3 gained posts; the sync point is still on page 1
+    pages = {1: page_html(1, 3), 2: page_html(2, 3), 3: page_html(3, 3, posts=4)}
+    assert run(tmp_path, pages) == [1, 2, 3]
+
+
+def test_pages_saved_before_the_last_are_skipped(tmp_path):
+    run(tmp_path, {n: page_html(n, 3) for n in (1, 2, 3)})
+    assert run(tmp_path, {n: page_html(n, 4) for n in (1, 2, 3, 4)}) == [3, 4]
+
+    # Page 3 was saved with page 4 behind it, so only page 4 can grow now
+    book = open_book(tmp_path)
+    try:
+        assert [n for n in (1, 2, 3, 4) if not book.already_done(url(n))] == [4]
+    finally:
+        book.close()